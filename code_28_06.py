@@ -1,20 +1,15 @@
 import streamlit as st
-from PIL import Image
-import pytesseract
-import pdfplumber
-from fpdf import FPDF
-import openai
 import os
-import requests
-import io
+import sys
 
-# Get the OpenAI API key from the environment variable
+# the tesseract engine and the upload helpers live with the pipeline modules in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+# Get the OpenAI API key from the environment variable, openai reads it itself on first import
 
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     st.error("API key not found. Please set the OPENAI_API_KEY environment variable.")
-else:
-    openai.api_key = api_key
 
 # Add custom CSS for better styling
 st.markdown(
@@ -52,14 +47,18 @@ st.markdown(
 )
 
 def extract_text_from_image(image):
+    # loaded tesseract engines shared by every session and rerun when tesserocr is installed, pytesseract otherwise
+    from tesseract_engine import image_to_string
+
     try:
-        text = pytesseract.image_to_string(image)
-        return text
+        return image_to_string(image)
     except Exception as e:
         st.error(f"Error extracting text from image: {e}")
         return None
 
 def extract_text_from_pdf(file):
+    import pdfplumber
+
     try:
         text = ""
         with pdfplumber.open(file) as pdf:
@@ -71,6 +70,8 @@ def extract_text_from_pdf(file):
         return None
 
 def analyze_contract(text):
+    import openai
+
     try:
         messages = [
             {"role": "system", "content": "You are a helpful assistant."},
@@ -88,6 +89,9 @@ def analyze_contract(text):
         return None
 
 def generate_signature(name):
+    import openai
+    import requests
+
     try:
         response = openai.Image.create(
             prompt=f"Handwritten signature of the name {name} in readable letters on white background",
@@ -96,52 +100,26 @@ def generate_signature(name):
         )
         image_url = response['data'][0]['url']
         image_response = requests.get(image_url)
-        image = Image.open(io.BytesIO(image_response.content))
-        signature_path = "/tmp/signature.png"
-        image.save(signature_path)
-        return signature_path
+        # keep the signature in memory, a shared /tmp file gets overwritten by concurrent sessions
+        return image_response.content
     except Exception as e:
         st.error(f"Error generating signature: {e}")
         return None
 
-def generate_termination_pdf(data, signature_path):
+def generate_termination_pdf(data, signature):
+    from letter_templates import get_template
+
     try:
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 10, txt="Termination Contract", ln=True, align='C')
-        pdf.ln(10)
-        
-        static_text = """
-        Kündigung zum nächstmöglichen Zeitpunkt           {data['effective_date']}
-
-        Sehr geehrte Damen und Herren,
-
-        hiermit kündige ich meinen Vertrag fristgerecht zum nächstmöglichen Zeitpunkt. 
-        Bitte senden Sie mir eine schriftliche Bestätigung der Kündigung unter Angabe des Beendigungszeitpunktes zu.
-
-        Mit freundlichen Grüßen
-        """
-        
-        pdf.multi_cell(0, 10, static_text)
-        pdf.ln(10)
-        
-        pdf.cell(200, 10, txt=f"Parties: {data['parties']}", ln=True)
-        pdf.cell(200, 10, txt=f"Customer Number: {data['customer_number']}", ln=True)
-        pdf.cell(200, 10, txt=f"Customer Name: {data['customer_name']}", ln=True)
-        pdf.cell(200, 10, txt=f"Contract Type: {data['contract_type']}", ln=True)
-        pdf.cell(200, 10, txt=f"Termination Clause: {data['termination_clause']}", ln=True)
-        pdf.cell(200, 10, txt=f"Effective Date: {data['effective_date']}", ln=True)
-        pdf.ln(20)
-        pdf.cell(200, 10, txt="Sincerely,", ln=True)
-        pdf.ln(20)
-        if signature_path:
-            pdf.image(signature_path, x=10, y=pdf.get_y(), w=60)
-        pdf.output("/tmp/termination_contract.pdf")
-        return True
+        # the german letter is compiled once per process, this script's keys are mapped onto its fields
+        letter = {
+            "company": [str(data.get('parties') or '')],
+            "contract_number": [str(data.get('customer_number') or '')],
+            "quitting_party": [str(data.get('customer_name') or '')],
+        }
+        return get_template("de").render_pdf(letter, signature)
     except Exception as e:
         st.error(f"Error generating PDF: {e}")
-        return False
+        return None
 
 def main():
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -169,19 +147,25 @@ def main():
         st.write("### Upload an Image")
         image_file = st.file_uploader("Upload an image", type=["png", "jpg", "jpeg"], help="Upload a contract image")
         if image_file:
+            from PIL import Image
+            from ingest import make_thumbnail
+
             st.markdown('<div class="upload-box">', unsafe_allow_html=True)
+            # show a downscaled preview, jpeg photos are decoded at reduced size for it
+            preview = make_thumbnail(image_file)
+            st.image(preview, caption='Uploaded Image', use_column_width=True)
+            image_file.seek(0)
             image = Image.open(image_file)
-            st.image(image, caption='Uploaded Image', use_column_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
             text = extract_text_from_image(image)
             if text and st.button("Generate Termination Contract"):
                 analysis_result, data = analyze_contract(text, analysis_depth, include_risk_assessment)
                 if analysis_result:
-                    signature_path = generate_signature(data.get('customer_name', ''))
-                    if generate_termination_pdf(data, signature_path):
+                    signature = generate_signature(data.get('customer_name', ''))
+                    pdf_bytes = generate_termination_pdf(data, signature)
+                    if pdf_bytes:
                         st.success("Termination Contract generated: termination_contract.pdf")
-                        with open("/tmp/termination_contract.pdf", "rb") as f:
-                            st.download_button("Download PDF", f, file_name="termination_contract.pdf")
+                        st.download_button("Download PDF", pdf_bytes, file_name="termination_contract.pdf")
     
     elif upload_type == "PDF":
         st.write("### Upload a PDF")
@@ -192,11 +176,11 @@ def main():
             if text and st.button("Generate Termination Contract"):
                 analysis_result, data = analyze_contract(text, analysis_depth, include_risk_assessment)
                 if analysis_result:
-                    signature_path = generate_signature(data.get('customer_name', ''))
-                    if generate_termination_pdf(data, signature_path):
+                    signature = generate_signature(data.get('customer_name', ''))
+                    pdf_bytes = generate_termination_pdf(data, signature)
+                    if pdf_bytes:
                         st.success("Termination Contract generated: termination_contract.pdf")
-                        with open("/tmp/termination_contract.pdf", "rb") as f:
-                            st.download_button("Download PDF", f, file_name="termination_contract.pdf")
+                        st.download_button("Download PDF", pdf_bytes, file_name="termination_contract.pdf")
     
     elif upload_type == "Text":
         st.write("### Input Text")
@@ -204,11 +188,11 @@ def main():
         if text and st.button("Generate Termination Contract"):
             analysis_result, data = analyze_contract(text, analysis_depth, include_risk_assessment)
             if analysis_result:
-                signature_path = generate_signature(data.get('customer_name', ''))
-                if generate_termination_pdf(data, signature_path):
+                signature = generate_signature(data.get('customer_name', ''))
+                pdf_bytes = generate_termination_pdf(data, signature)
+                if pdf_bytes:
                     st.success("Termination Contract generated: termination_contract.pdf")
-                    with open("/tmp/termination_contract.pdf", "rb") as f:
-                        st.download_button("Download PDF", f, file_name="termination_contract.pdf")
+                    st.download_button("Download PDF", pdf_bytes, file_name="termination_contract.pdf")
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,14 @@
 import streamlit as st
-from PIL import Image
-import pytesseract
-import pdfplumber
-from fpdf import FPDF
-import openai
 import os
+import sys
 
-# Get the OpenAI API key from the environment variable
+# the passage index and the tesseract engine live with the pipeline modules in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+# Get the OpenAI API key from the environment variable, openai reads it itself on first import
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     st.error("API key not found. Please set the OPENAI_API_KEY environment variable.")
-else:
-    openai.api_key = api_key
 
 # Add custom CSS for better styling
 st.markdown(
@@ -49,14 +46,18 @@ st.markdown(
 )
 
 def extract_text_from_image(image):
+    # loaded tesseract engines shared by every session and rerun when tesserocr is installed, pytesseract otherwise
+    from tesseract_engine import image_to_string
+
     try:
-        text = pytesseract.image_to_string(image)
-        return text
+        return image_to_string(image)
     except Exception as e:
         st.error(f"Error extracting text from image: {e}")
         return None
 
 def extract_text_from_pdf(file):
+    import pdfplumber
+
     try:
         text = ""
         with pdfplumber.open(file) as pdf:
@@ -68,7 +69,15 @@ def extract_text_from_pdf(file):
         return None
 
 def analyze_contract(text, depth="Basic", risk_assessment=False):
+    import openai
+
     try:
+        if depth == "Advanced":
+            from passage_index import select_passages
+
+            # long contracts: only the passages about the parties, termination (and risks) go into the prompt
+            questions = ["parties", "termination"] + (["risks"] if risk_assessment else [])
+            text = select_passages(text, questions)
         messages = [
             {"role": "system", "content": "You are a helpful assistant."},
             {"role": "user", "content": f"Analyze the following contract text with {depth} analysis and {'include' if risk_assessment else 'do not include'} risk assessment:\n\n{text}\n\n"}
@@ -90,6 +99,8 @@ def analyze_contract(text, depth="Basic", risk_assessment=False):
         return None, None
 
 def generate_termination_pdf(data):
+    from fpdf import FPDF
+
     try:
         pdf = FPDF()
         pdf.add_page()
@@ -130,6 +141,8 @@ def main():
         st.write("### Upload an Image")
         image_file = st.file_uploader("Upload an image", type=["png", "jpg", "jpeg"], help="Upload a contract image")
         if image_file:
+            from PIL import Image
+
             st.markdown('<div class="upload-box">', unsafe_allow_html=True)
             image = Image.open(image_file)
             st.image(image, caption='Uploaded Image', use_column_width=True)
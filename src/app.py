@@ -1,7 +1,7 @@
 import os
 import streamlit as st
-import openai
-from data_extraction import DataExtractor
+from ingest import SpooledUpload
+from jobs import ANALYSIS_STAGES, DONE, FAILED, LETTER_STAGES, QUEUED, RUNNING, JobQueue
 
 
 # Add custom CSS for better styling
@@ -35,16 +35,80 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+#one job queue per server process, its workers, caches and pools are shared by every session
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+
+@st.cache_data
+def load_logo(path="logo.png"):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+#copy (and hash) an upload once per session, large files are spooled to disk; reruns reuse it
+def ingest_upload(uploaded_file):
+    uploads = st.session_state.setdefault("uploads", {})
+    if uploaded_file.file_id not in uploads:
+        # only the current upload is kept, earlier spool files are removed
+        for upload in uploads.values():
+            upload.close()
+        uploads.clear()
+        uploads[uploaded_file.file_id] = SpooledUpload(uploaded_file, uploaded_file.name)
+    return uploads[uploaded_file.file_id]
+
+
+#the same upload maps to the same analysis job across sessions, the upload is not hashed again
+@st.cache_data(show_spinner=False, max_entries=256)
+def analysis_job(file_hash, _upload, filename):
+    return get_job_queue().submit(upload=_upload, filename=filename, stages=ANALYSIS_STAGES)
+
+
+def render_job(job, show_results):
+    result = job["result"]
+    if job["status"] in (QUEUED, RUNNING):
+        st.progress(job["progress"], text=f"Working on: {job['stage'] or 'queued'}")
+    if show_results and ("text" in result or "preview" in result):
+        preview = result["text"][:500] if "text" in result else result["preview"]
+        st.write("Extracted text (first 500 characters):", preview)  # Display a preview of extracted text
+    if show_results and "fields" in result and "extracted_info" not in result:
+        st.write("Detected so far:", result["fields"])
+    if show_results and "extracted_info" in result:
+        st.write("Analysis Result:", result["extracted_info"])
+    if job["status"] == FAILED:
+        st.error(f"An error occurred during analysis: {job['error']}")
+
+
+#polls a running job without blocking the script, a full rerun follows once it finishes
+@st.fragment(run_every=2)
+def poll_job(job_id, show_results):
+    job = get_job_queue().get(job_id)
+    render_job(job, show_results)
+    if job["status"] in (DONE, FAILED):
+        st.rerun()
+
+
+#show_results=False only reports progress and errors
+def show_job(job_id, show_results=True):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return None
+    if job["status"] in (QUEUED, RUNNING):
+        poll_job(job_id, show_results)
+    else:
+        render_job(job, show_results)
+    return job
+
+
 def main():
     col1, col2, col3 = st.columns([1, 2, 1])
     
     with col2:
-        st.image("logo.png", use_column_width=True)
+        st.image(load_logo(), use_column_width=True)
         st.markdown('<div class="title">AI Contract Quitter</div>', unsafe_allow_html=True)
 
     st.write("Upload a PDF of the contract for analysis.")
-    
-    data_extractor = DataExtractor(file_path=None, file_type=None, image_path=None)
 
     st.write("### Upload a PDF")
     pdf_file = st.file_uploader("Upload a PDF", type=["pdf"], help="Upload a contract PDF")
@@ -52,41 +116,53 @@ def main():
     if 'analysis_complete' not in st.session_state:
         st.session_state.analysis_complete = False
         st.session_state.analysis_attempts = 0
+        # analysis and letter job ids per file hash, kept for the whole session
+        st.session_state.jobs = {}
+        st.session_state.letter_jobs = {}
 
     if pdf_file:
         st.write(f"Uploaded: {pdf_file.name}")
         st.markdown('</div>', unsafe_allow_html=True)
-        
-        data_extractor.file_path = pdf_file
-        data_extractor.file_type = pdf_file.type
+
+        queue = get_job_queue()
+        upload = ingest_upload(pdf_file)
+        file_hash = upload.sha256
         
         if st.button("Analyze", key=f"analyze_button_{st.session_state.analysis_attempts}"):
             st.session_state.analysis_attempts += 1
-            with st.spinner("Analyzing PDF..."):
-                try:
-                    text = data_extractor.extract_text_from_pdf()
-                    if text:
-                        st.write("Extracted text (first 500 characters):", text[:500])  # Display a preview of extracted text
-                        try:
-                            data = data_extractor.analyze_and_extract_contract_info(text)
-                            if data:
-                                st.write("Analysis Result:", data)
-                                st.session_state.analysis_complete = True
-                                if st.button("Accept Analysis"):
-                                    st.success("Analysis accepted!")
-                                    # Here you can add code to proceed with the next steps
-                                if st.button("Retry Analysis"):
-                                    st.session_state.analysis_complete = False
-                                    st.experimental_rerun()
-                            else:
-                                st.error("Failed to extract structured data from the PDF. Raw text was extracted but could not be parsed.")
-                        except Exception as e:
-                            st.error(f"An error occurred in analyze_and_extract_contract_info: {str(e)}")
-                            st.write("Debug: Text passed to analyze_and_extract_contract_info:", text[:1000])  # Show first 1000 characters
-                    else:
-                        st.error("Failed to extract any text from the PDF. The file may be empty or corrupted.")
-                except Exception as e:
-                    st.error(f"An error occurred during analysis: {str(e)}")
+            job_id = analysis_job(file_hash, upload, pdf_file.name)
+            # a failed job is run again, one removed by the retention sweep is submitted again
+            cached_job = queue.get(job_id)
+            if cached_job is None or cached_job["status"] == FAILED:
+                job_id = queue.submit(upload=upload, filename=pdf_file.name, stages=ANALYSIS_STAGES)
+            st.session_state.jobs[file_hash] = job_id
+
+        job = None
+        if file_hash in st.session_state.jobs:
+            job = show_job(st.session_state.jobs[file_hash])
+        st.session_state.analysis_complete = job is not None and job["status"] == DONE
+
+        if st.session_state.analysis_complete:
+            result = job["result"]
+            if st.button("Accept Analysis"):
+                st.success("Analysis accepted!")
+                # Here you can add code to proceed with the next steps
+            if st.button("Retry Analysis"):
+                # reuse the extracted text and bypass the response cache for a fresh completion
+                st.session_state.jobs[file_hash] = queue.submit(
+                    stages=["analyze"], options={"use_cache": False}, result={"text": result["text"]}
+                )
+                st.rerun()
+            if st.button("Generate Termination Letter"):
+                st.session_state.letter_jobs[file_hash] = queue.submit(
+                    stages=LETTER_STAGES, result={"extracted_info": result["extracted_info"]}
+                )
+
+            letter_job_id = st.session_state.letter_jobs.get(file_hash)
+            letter_job = show_job(letter_job_id, show_results=False) if letter_job_id else None
+            if letter_job and letter_job["status"] == DONE:
+                with open(letter_job["result"]["pdf_path"], "rb") as f:
+                    st.download_button("Download PDF", f.read(), file_name="termination_letter.pdf")
 
         if not st.session_state.analysis_complete:
             st.info("You can press the 'Analyze' button again to retry the analysis.")
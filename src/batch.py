@@ -0,0 +1,177 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import config
+from data_extraction import DataExtractor
+
+
+PDF_EXTENSIONS = {".pdf"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+
+#per-process state set up by the pool initializer
+_extractor = None
+_options = None
+
+
+#documents from a directory (recursively) or a manifest with one path or json object per line
+def discover(source):
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if os.path.splitext(name)[1].lower() in PDF_EXTENSIONS | IMAGE_EXTENSIONS:
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["path"] if line.startswith("{") else line
+            paths.append(path if os.path.isabs(path) else os.path.join(base, path))
+    return paths
+
+
+#documents already processed successfully according to the results file
+def load_checkpoint(output_path, retry_failed):
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # the last line may be cut short by a crash
+                continue
+            if record.get("status") == "ok" or not retry_failed:
+                done.add(record["path"])
+    return done
+
+
+def _init_worker(options, workers):
+    global _extractor, _options
+    _options = options
+    # every process has its own llm gateway, the configured limits are shared out so the batch as a whole keeps to them
+    config.LLM_REQUESTS_PER_MINUTE = config.LLM_REQUESTS_PER_MINUTE / workers
+    config.LLM_MAX_IN_FLIGHT = max(1, config.LLM_MAX_IN_FLIGHT // workers)
+    # the batch pool already runs one document per process, a pdf or ocr pool in each would start workers x cpus more
+    config.OCR_WORKERS = 1
+    _extractor = DataExtractor(file_path=None, file_type=None, image_path=None)
+    _extractor.pdf_engine.workers = 1
+
+
+#contracts with the same name in different folders or with different extensions get their own letter,
+#the path hash keeps the name stable between runs
+def _pdf_name(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    return f"{stem}_{digest}_termination.pdf"
+
+
+def process_document(path):
+    start = time.perf_counter()
+    record = {"path": path, "status": "error", "extracted_info": None, "pdf": None, "error": None}
+    try:
+        extension = os.path.splitext(path)[1].lower()
+        if extension in PDF_EXTENSIONS:
+            _extractor.file_path = path
+            text = _extractor.extract_text_from_pdf(_options["extract_mode"])
+        else:
+            _extractor.image_path = path
+            text = _extractor.extract_text_from_image(_options["extract_mode"])
+        if not text:
+            raise ValueError("no text extracted")
+
+        data = _extractor.analyze_and_extract_contract_info(text)
+        if not data:
+            raise ValueError("analysis failed")
+        record["extracted_info"] = data
+
+        if _options["pdf_dir"]:
+            signature = _options["signature"]
+            if _options["generate_signatures"] and data["quitting_party"]:
+                signature = _extractor.generate_signature(data["quitting_party"][0])
+            pdf_bytes = DataExtractor.generate_termination_pdf(data, signature)
+            if pdf_bytes is None:
+                raise ValueError("pdf generation failed")
+            pdf_path = os.path.join(_options["pdf_dir"], _pdf_name(path))
+            with open(pdf_path, "wb") as f:
+                f.write(pdf_bytes)
+            record["pdf"] = pdf_path
+        record["status"] = "ok"
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run(paths, output_path, options, workers):
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options, workers)) as pool:
+        pending = set()
+        remaining = iter(paths)
+        ok = failed = 0
+        while True:
+            # keep a small window in flight instead of queueing the whole backlog
+            while len(pending) < workers * 2:
+                path = next(remaining, None)
+                if path is None:
+                    break
+                pending.add(pool.submit(process_document, path))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if record["status"] == "ok":
+                    ok += 1
+                else:
+                    failed += 1
+                print(f"[{ok + failed}/{len(paths)}] {record['status']} {record['path']}", file=sys.stderr)
+    return ok, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract, analyze and write termination letters for a folder of contracts")
+    parser.add_argument("source", help="directory of PDFs/images or a manifest file")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL results file, also the resume checkpoint")
+    parser.add_argument("--pdf-dir", default=None, help="write termination PDFs here")
+    parser.add_argument("--signature", default="signature.png", help="signature image used for the letters")
+    parser.add_argument("--generate-signatures", action="store_true", help="generate a signature per quitting party")
+    parser.add_argument("--extract-mode", choices=["fields", "full"], default=None,
+                        help="stop reading once every field is found, or read every page (default from CONTRACT_EXTRACTION_MODE)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--retry-failed", action="store_true", help="process documents that failed in an earlier run again")
+    args = parser.parse_args(argv)
+
+    paths = discover(args.source)
+    done = load_checkpoint(args.output, args.retry_failed)
+    todo = [path for path in paths if path not in done]
+    print(f"{len(paths)} documents, {len(paths) - len(todo)} already done", file=sys.stderr)
+
+    if args.pdf_dir:
+        os.makedirs(args.pdf_dir, exist_ok=True)
+    options = {
+        "pdf_dir": args.pdf_dir,
+        "signature": args.signature,
+        "generate_signatures": args.generate_signatures,
+        "extract_mode": args.extract_mode
+    }
+    ok, failed = run(todo, args.output, options, max(1, args.workers))
+    print(f"done: {ok} ok, {failed} failed", file=sys.stderr)
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import argparse
+import os
+import tempfile
+import time
+
+from fpdf import FPDF
+
+from pdf_engine import PDFExtractionEngine
+
+
+#build a synthetic contract with a full page of text on every page
+def make_synthetic_pdf(path, pages=200, lines_per_page=45):
+    pdf = FPDF()
+    pdf.set_font("Arial", size=10)
+    for page_number in range(1, pages + 1):
+        pdf.add_page()
+        for line in range(lines_per_page):
+            pdf.cell(0, 5, txt=f"Page {page_number} clause {line}: the policyholder may terminate this contract with notice.", ln=True)
+    pdf.output(path)
+
+
+def run(path, workers, chunk_pages, repeat):
+    engine = PDFExtractionEngine(workers=workers, chunk_pages=chunk_pages, min_parallel_pages=0)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.extract_text(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel PDF text extraction")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--chunk-pages", type=int, default=10)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        make_synthetic_pdf(path, pages=args.pages)
+
+        baseline = None
+        workers = 1
+        while workers <= args.max_workers:
+            elapsed = run(path, workers, args.chunk_pages, args.repeat)
+            baseline = baseline or elapsed
+            print(f"workers={workers:<3} time={elapsed:.2f}s speedup={baseline / elapsed:.2f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import time
+
+from letter_templates import LAYOUTS, LetterTemplate, get_template
+
+
+SAMPLE = {
+    "company": ["Musterversicherung AG"],
+    "contract_number": ["AS-1234567/89"],
+    "date_of_birth": ["01.02.1980"],
+    "quitting_party": ["Max Mustermann"]
+}
+
+
+def measure(label, count, render):
+    start = time.perf_counter()
+    render()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {count / elapsed:8.1f} letters/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark termination letter rendering")
+    parser.add_argument("--letters", type=int, default=200)
+    parser.add_argument("--language", default="en", choices=sorted(LAYOUTS))
+    parser.add_argument("--signature", default="../signature.png")
+    args = parser.parse_args()
+
+    with open(args.signature, "rb") as f:
+        signature = f.read()
+    letters = [(SAMPLE, signature)] * args.letters
+    template = get_template(args.language)
+
+    measure("layout rebuilt per letter", args.letters,
+            lambda: [LetterTemplate(LAYOUTS[args.language]).render_pdf(data, sig) for data, sig in letters])
+    measure("compiled template", args.letters,
+            lambda: [template.render_pdf(data, sig) for data, sig in letters])
+    measure("bulk, separate pdfs", args.letters, lambda: template.render_many(letters))
+    measure("bulk, merged pdf", args.letters, lambda: template.render_many(letters, merged=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import random
+import time
+
+import config
+import tesseract_engine
+from bench_suite import contract_lines, render_page_image
+from ocr_service import PROFILES, binarize
+
+
+#synthetic scanned pages, already grayscale and binarized like the ocr service hands them to tesseract
+def make_pages(count, pages_per_document, seed):
+    rng = random.Random(seed)
+    pages = []
+    for index in range(count):
+        lines = contract_lines(rng, index, pages_per_document)[index % pages_per_document]
+        pages.append(binarize(render_page_image(lines, dpi=200).convert("L")))
+    return pages
+
+
+def run(backend, pages, tesseract_config, lang):
+    config.OCR_BACKEND = backend
+    start = time.perf_counter()
+    # the first call loads the engine, it is counted like every other call
+    for page in pages:
+        tesseract_engine.image_to_string(page, lang=lang, config=tesseract_config)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the persistent tesseract engine against one tesseract process per call")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--profile", default="fast", choices=sorted(PROFILES))
+    parser.add_argument("--lang", default=config.OCR_LANG)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, 3, args.seed)
+    tesseract_config = PROFILES[args.profile]["tesseract_config"]
+    config.OCR_BACKEND = "tesserocr"
+    if tesseract_engine.active_backend() != "tesserocr":
+        print("tesserocr is not installed, only the pytesseract path is measured")
+        backends = ["pytesseract"]
+    else:
+        backends = ["pytesseract", "tesserocr"]
+
+    results = {}
+    for backend in backends:
+        results[backend] = run(backend, pages, tesseract_config, args.lang)
+        print(f"{backend:<12} {args.pages / results[backend]:8.2f} pages/s  {1000 * results[backend] / args.pages:8.1f} ms/page")
+    if len(results) == 2:
+        print(f"speedup      {results['pytesseract'] / results['tesserocr']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# benchmarks start from cold caches, set before the pipeline modules read their config
+os.environ.setdefault("CONTRACT_CACHE_DIR", tempfile.mkdtemp(prefix="contract_bench_"))
+
+import openai
+from fpdf import FPDF
+from PIL import Image, ImageDraw, ImageFilter
+
+import config
+from data_extraction import DataExtractor
+
+
+FIRST_NAMES = ["Max", "Anna", "Jonas", "Lea", "Paul", "Mia", "Felix", "Emma"]
+LAST_NAMES = ["Mustermann", "Schmidt", "Weber", "Fischer", "Becker", "Wagner"]
+COMPANIES = ["Musterversicherung AG", "Nordlicht Insurance Ltd", "Alpen Leben GmbH", "Rhein Mobilfunk SE"]
+FILLER = ("The policyholder may terminate this contract in writing with a notice period of three months "
+          "to the end of the insurance year. Premiums are due monthly in advance.")
+
+
+#the fields and body lines of one synthetic contract
+def contract_lines(rng, index, pages):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    header = [
+        rng.choice(COMPANIES),
+        "Postfach 1234, 80000 München",
+        "",
+        f"Vertragsnummer: {rng.randint(10, 99)}-{index:07d}",
+        f"Versicherungsnehmer: {name}",
+        f"Geburtsdatum: {rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1950, 2000)}",
+        "",
+    ]
+    pages_of_lines = []
+    for page in range(pages):
+        lines = header if page == 0 else []
+        lines = lines + [f"§ {page * 10 + clause + 1} {FILLER}" for clause in range(10)]
+        pages_of_lines.append(lines)
+    return pages_of_lines
+
+
+def render_page_image(lines, dpi=150, skew=0.0):
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    y = dpi // 2
+    for line in lines:
+        draw.text((dpi // 2, y), line[:110], fill=0)
+        y += dpi // 6
+    if skew:
+        image = image.rotate(skew, expand=True, fillcolor=255)
+    # scanner noise
+    return image.filter(ImageFilter.GaussianBlur(0.6))
+
+
+#kind is "text" (text layer), "scan" (single page image) or "mixed" (every other pdf page is a scanned image)
+def make_document(kind, index, pages, rng):
+    pages_of_lines = contract_lines(rng, index, pages)
+    if kind == "scan":
+        output = io.BytesIO()
+        render_page_image(pages_of_lines[0], skew=rng.uniform(-2, 2)).save(output, format="PNG")
+        return output.getvalue()
+
+    pdf = FPDF()
+    for number, lines in enumerate(pages_of_lines):
+        pdf.add_page()
+        if kind == "mixed" and number % 2 == 1:
+            image = io.BytesIO()
+            render_page_image(lines).save(image, format="PNG")
+            pdf.image(image, x=0, y=0, w=210)
+            continue
+        pdf.set_font("Helvetica", size=9)
+        for line in lines:
+            pdf.multi_cell(0, 5, text=line, new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+#what the mock model answers for every field
+MOCK_FIELDS = {"company": "Musterversicherung AG", "contract_number": "12-0000001",
+               "date_of_birth": "01.01.1980", "quitting_party": "Max Mustermann"}
+
+
+#local stand-in for the openai chat and image endpoints with configurable latency
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    chat_latency = 0.5
+    image_latency = 2.0
+    signature_png = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/chat/completions"):
+            time.sleep(self.chat_latency)
+            if request.get("functions"):
+                # structured mode: answer with the requested fields as function-call arguments
+                function = request["functions"][0]
+                arguments = {key: MOCK_FIELDS[key] for key in function["parameters"]["properties"]}
+                message = {"role": "assistant", "content": None,
+                           "function_call": {"name": function["name"], "arguments": json.dumps(arguments)}}
+            else:
+                content = "Company: Musterversicherung AG\nContract Number: 12-0000001\nDate of Birth: 01.01.1980\nQuitting Party: Max Mustermann"
+                message = {"role": "assistant", "content": content}
+            self._send_json({
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()), "model": request.get("model"),
+                "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        elif self.path.endswith("/images/generations"):
+            time.sleep(self.image_latency)
+            host, port = self.server.server_address
+            self._send_json({"created": int(time.time()), "data": [{"url": f"http://{host}:{port}/signature.png"}]})
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        if self.path == "/signature.png":
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(self.signature_png)))
+            self.end_headers()
+            self.wfile.write(self.signature_png)
+        else:
+            self.send_error(404)
+
+
+def start_mock_server(chat_latency, image_latency):
+    signature = io.BytesIO()
+    Image.new("RGB", (256, 256), "white").save(signature, format="PNG")
+    MockOpenAIHandler.chat_latency = chat_latency
+    MockOpenAIHandler.image_latency = image_latency
+    MockOpenAIHandler.signature_png = signature.getvalue()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    openai.api_base = f"http://{host}:{port}/v1"
+    openai.api_key = "mock"
+    os.environ["OPENAI_API_KEY"] = "mock"
+    return server
+
+
+#nearest-rank percentile
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+#rss in mb of a live process, None where /proc is not available
+def rss_mb(pid="self"):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+#pids of the live children of this process, e.g. the pdf and ocr pool workers
+def child_pids():
+    pids = []
+    for task in os.listdir("/proc/self/task"):
+        try:
+            with open(f"/proc/self/task/{task}/children") as f:
+                pids.extend(f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+#samples the rss of this process and the summed rss of its live children while a stage runs;
+#ru_maxrss would only give lifetime peaks and RUSAGE_CHILDREN only counts children that have exited,
+#so pool workers that stay alive were never seen; spikes shorter than the interval can be missed
+class RSSSampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = None
+        self.peak_children_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _sample(self):
+        own = rss_mb()
+        if own is None:
+            return
+        children = sum(rss or 0 for rss in map(rss_mb, child_pids()))
+        self.peak_mb = max(self.peak_mb or 0, own)
+        self.peak_children_mb = max(self.peak_children_mb or 0, children)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+#peak rss is sampled during the stage only (see RSSSampler), None where /proc is not available
+def run_stage(name, inputs, operation):
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    with RSSSampler() as rss:
+        for item in inputs:
+            began = time.perf_counter()
+            try:
+                if operation(item) is None:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    report = {
+        "count": len(inputs),
+        "errors": errors,
+        "throughput_per_s": round(len(inputs) / elapsed, 3) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "peak_rss_mb": round(rss.peak_mb, 1) if rss.peak_mb is not None else None,
+        "peak_rss_children_mb": round(rss.peak_children_mb, 1) if rss.peak_children_mb is not None else None,
+    }
+    print(f"{name:<18} {report['throughput_per_s']:>9} /s  p50 {report['p50_ms']:>9} ms  "
+          f"p95 {report['p95_ms']:>9} ms  p99 {report['p99_ms']:>9} ms  errors {errors}", file=sys.stderr)
+    return report
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    start_mock_server(args.chat_latency, args.image_latency)
+    extractor = DataExtractor(file_path=None, file_type=None, image_path=None)
+
+    text_pdfs = [make_document("text", i, args.pages, rng) for i in range(args.documents)]
+    mixed_pdfs = [make_document("mixed", args.documents + i, args.pages, rng) for i in range(args.documents)]
+    scans = [make_document("scan", 2 * args.documents + i, 1, rng) for i in range(args.documents)]
+    # early exit leaves the first pages in the extraction cache, fields mode reads its own copies of the text documents
+    field_pdfs = [make_document("text", 3 * args.documents + i, args.pages, rng) for i in range(args.documents)]
+
+    def extract_pdf(data, mode="full"):
+        extractor.file_path = data
+        return extractor.extract_text_from_pdf(mode)
+
+    def ocr_image(data, mode="full"):
+        extractor.image_path = data
+        return extractor.extract_text_from_image(mode)
+
+    stages = {}
+    stages["extract_text_pdf"] = run_stage("extract_text_pdf", text_pdfs, extract_pdf)
+    # read after the stage so it starts from a cold extraction cache
+    texts = [extract_pdf(data) or "" for data in text_pdfs[:1]]
+    stages["extract_fields_pdf"] = run_stage("extract_fields_pdf", field_pdfs, lambda data: extract_pdf(data, "fields"))
+    stages["extract_mixed_pdf"] = run_stage("extract_mixed_pdf", mixed_pdfs, extract_pdf)
+    stages["ocr_image"] = run_stage("ocr_image", scans, ocr_image)
+    stages["ocr_image_regions"] = run_stage("ocr_image_regions", scans, lambda data: ocr_image(data, "fields"))
+
+    # distinct texts so the response cache never answers
+    texts = [f"{texts[0]}\nReference {i}" for i in range(args.documents)]
+    stages["analyze_fast_path"] = run_stage("analyze_fast_path", texts, extractor.analyze_and_extract_contract_info)
+    threshold = config.FAST_PATH_MIN_CONFIDENCE
+    config.FAST_PATH_MIN_CONFIDENCE = 2.0
+    try:
+        stages["analyze_llm"] = run_stage("analyze_llm", texts, extractor.analyze_and_extract_contract_info)
+    finally:
+        config.FAST_PATH_MIN_CONFIDENCE = threshold
+
+    names = [f"Person {i}" for i in range(args.documents)]
+    stages["signature_local"] = run_stage("signature_local", names, lambda name: extractor.generate_signature(name, latency_budget=0))
+    stages["signature_remote"] = run_stage("signature_remote", [f"Remote {name}" for name in names], extractor.generate_signature)
+
+    letter = {"company": ["Musterversicherung AG"], "contract_number": ["12-0000001"],
+              "date_of_birth": ["01.01.1980"], "quitting_party": ["Max Mustermann"]}
+    signature = extractor.generate_signature("Max Mustermann", latency_budget=0)
+    stages["render_letter"] = run_stage("render_letter", [letter] * args.documents,
+                                        lambda data: DataExtractor.generate_termination_pdf(data, signature))
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "parameters": vars(args),
+        "stages": stages,
+    }
+
+
+#percentage change per stage and metric against a previous baseline
+def compare(current, baseline):
+    for stage, metrics in current["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        changes = []
+        for metric in ("throughput_per_s", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb", "peak_rss_children_mb"):
+            if previous.get(metric) and metrics.get(metric) is not None:
+                change = (metrics[metric] - previous[metric]) / previous[metric] * 100
+                changes.append(f"{metric} {change:+.1f}%")
+        print(f"{stage:<18} " + "  ".join(changes), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the contract pipeline on a synthetic corpus")
+    parser.add_argument("--documents", type=int, default=10, help="documents per corpus")
+    parser.add_argument("--pages", type=int, default=5, help="pages per pdf")
+    parser.add_argument("--chat-latency", type=float, default=0.5, help="seconds the mock chat endpoint waits")
+    parser.add_argument("--image-latency", type=float, default=2.0, help="seconds the mock image endpoint waits")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="bench_baseline.json", help="write the JSON report here")
+    parser.add_argument("--compare", default=None, help="baseline JSON to diff against")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import re
+
+#pages are joined with a form feed by the extractor
+PAGE_SEPARATOR = "\f"
+
+#lines that start a new section: "§ 5", "5.", "5.2", "Section 5", "Article V", "Artikel 5" or an all-caps heading
+#only the keywords ignore case, the heading branch must not match ordinary lines
+_section_start = re.compile(
+    r"^\s*(§\s*\d+|\d+(\.\d+)*\.?\s+\S|(?i:section|article|artikel|clause|abschnitt)\s+[\dIVXLC]+|[A-ZÄÖÜ][A-ZÄÖÜ0-9 \-]{3,}$)"
+)
+
+#tiktoken encoding loaded on first use, False when tiktoken is not installed
+_encoding = None
+
+
+def estimate_tokens(text):
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    # roughly four characters per token for latin scripts
+    return len(text) // 4 + 1
+
+
+#split a page into sections at heading lines
+def _split_sections(page):
+    sections = []
+    current = []
+    for line in page.splitlines():
+        if current and _section_start.match(line) and not line.strip().isdigit():
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+#split a unit that is over budget at line boundaries, and single long lines by characters
+def _split_oversized(unit, max_tokens):
+    pieces = []
+    current = []
+    current_tokens = 0
+    for line in unit.splitlines():
+        line_tokens = estimate_tokens(line)
+        if line_tokens > max_tokens:
+            step = max(1, len(line) * max_tokens // line_tokens)
+            pieces.extend(line[i:i + step] for i in range(0, len(line), step))
+            continue
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+#pack pages and sections greedily into chunks that fit within max_tokens
+def chunk_text(text, max_tokens):
+    units = []
+    for page in text.split(PAGE_SEPARATOR):
+        for section in _split_sections(page):
+            if not section.strip():
+                continue
+            if estimate_tokens(section) > max_tokens:
+                units.extend(_split_oversized(section, max_tokens))
+            else:
+                units.append(section)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,153 @@
+import math
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+
+from chunking import PAGE_SEPARATOR, estimate_tokens
+
+
+#lines at the top and bottom of a page that can be a running header or footer
+EDGE_LINES = 5
+#a line is boilerplate once it sits on at least this share of the pages (and on two of them)
+REPEAT_SHARE = 0.5
+
+_words = re.compile(r"\S+")
+_digits = re.compile(r"\d+")
+#page numbers: "Seite 3 von 9", "Page 3 of 9", "- 3 -", "3/9" or a bare number; only these are matched with their numbers ignored
+_page_number = re.compile(
+    r"^[\-–(\[ ]*((seite|page|blatt|s\.|p\.)\s*)?\d+(\s*(von|of|/)\s*\d+)?[\-–)\] ]*$",
+    re.IGNORECASE
+)
+#a word broken at the line end: "Kündi-" followed by a line starting in lower case
+_hyphenated = re.compile(r"\w-$")
+#"Kranken- und Pflegeversicherung" keeps its hyphen
+_conjunctions = {"und", "oder", "bzw.", "and", "or"}
+
+
+#compacted text with a map from its offsets back to the original text and pages
+@dataclass
+class CompactText:
+    text: str
+    original: str
+    tokens_before: int
+    tokens_after: int
+    removed_lines: int
+    # word starts in the compact text and where the same word starts in the original
+    _compact_starts: list = field(default_factory=list, repr=False)
+    _original_starts: list = field(default_factory=list, repr=False)
+    _page_starts: list = field(default_factory=list, repr=False)
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+    def original_offset(self, offset):
+        index = bisect_right(self._compact_starts, offset) - 1
+        if index < 0:
+            return 0
+        return self._original_starts[index] + offset - self._compact_starts[index]
+
+    #1-based page of the original text that a compact offset comes from
+    def page_of(self, offset):
+        return bisect_right(self._page_starts, self.original_offset(offset))
+
+    #page a value was found on, None when the compact text does not contain it
+    def page_of_value(self, value):
+        offset = self.text.find(value) if value else -1
+        if offset < 0:
+            return None
+        return self.page_of(offset)
+
+
+#same line on every page once spacing is ignored; page numbers also ignore the number: "Seite 3 von 9" == "Seite 4 von 9"
+#every other line is compared exactly, table rows like "Beitrag 2023: 1200 EUR" differ and are kept
+def _line_key(line):
+    key = " ".join(line.split())
+    return _digits.sub("#", key) if _page_number.match(key) else key
+
+
+#{line index: key} for the first and last EDGE_LINES non-blank lines of a page
+#the key holds the position counted from the top or the bottom, a running header sits at the same one on every page
+def _edge_keys(lines):
+    filled = [index for index, line in enumerate(lines) if line.strip()]
+    keys = {}
+    for position, index in enumerate(filled[-EDGE_LINES:]):
+        keys[index] = (position - min(EDGE_LINES, len(filled)), _line_key(lines[index]))
+    for position, index in enumerate(filled[:EDGE_LINES]):
+        keys[index] = (position, _line_key(lines[index]))
+    return keys
+
+
+#keys of the header and footer lines that repeat across pages
+def _repeated_lines(page_keys):
+    seen = {}
+    for keys in page_keys:
+        for key in set(keys.values()):
+            seen[key] = seen.get(key, 0) + 1
+    needed = max(2, math.ceil(len(page_keys) * REPEAT_SHARE))
+    return {key for key, pages_seen in seen.items() if pages_seen >= needed}
+
+
+#drop repeated headers and footers (their first occurrence stays), join hyphenated words and collapse whitespace
+def compact_text(text):
+    page_texts = text.split(PAGE_SEPARATOR)
+    pages = [page.split("\n") for page in page_texts]
+    page_keys = [_edge_keys(lines) for lines in pages]
+    repeated = _repeated_lines(page_keys) if len(pages) > 1 else set()
+
+    out = []
+    length = 0
+    compact_starts = []
+    original_starts = []
+    page_starts = []
+    kept_keys = set()
+    removed = 0
+    page_offset = 0
+    for page_number, lines in enumerate(pages):
+        page_starts.append(page_offset)
+        if page_number:
+            out.append(PAGE_SEPARATOR)
+            length += 1
+        line_offset = page_offset
+        started = False
+        blank = False
+        carry = False
+        for index, line in enumerate(lines):
+            start = line_offset
+            line_offset += len(line) + 1
+            key = page_keys[page_number].get(index)
+            if key in repeated:
+                if key in kept_keys:
+                    removed += 1
+                    continue
+                kept_keys.add(key)
+            words = list(_words.finditer(line))
+            if not words:
+                # runs of blank lines collapse into one
+                blank = started
+                continue
+            if carry and not blank and words[0].group()[:1].islower() and words[0].group() not in _conjunctions:
+                # remove the hyphen and glue the word halves
+                out[-1] = out[-1][:-1]
+                length -= 1
+            elif started:
+                out.append("\n\n" if blank else "\n")
+                length += 2 if blank else 1
+            for position, word in enumerate(words):
+                if position:
+                    out.append(" ")
+                    length += 1
+                compact_starts.append(length)
+                original_starts.append(start + word.start())
+                out.append(word.group())
+                length += len(word.group())
+            started = True
+            blank = False
+            carry = bool(_hyphenated.search(words[-1].group()))
+        page_offset += len(page_texts[page_number]) + 1
+
+    compact = "".join(out)
+    return CompactText(
+        compact, text, estimate_tokens(text), estimate_tokens(compact), removed,
+        compact_starts, original_starts, page_starts
+    )
@@ -0,0 +1,101 @@
+import os
+
+
+#read an integer setting from the environment, falling back to a default
+def _env_int(name, default):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+#settings for the pdf extraction engine
+PDF_WORKERS = _env_int("CONTRACT_PDF_WORKERS", os.cpu_count() or 1)
+PDF_CHUNK_PAGES = _env_int("CONTRACT_PDF_CHUNK_PAGES", 10)
+#documents with fewer pages than this are parsed in-process, the pool start-up cost is not worth it
+PDF_PARALLEL_MIN_PAGES = _env_int("CONTRACT_PDF_PARALLEL_MIN_PAGES", 20)
+
+#settings for the text-layer check and ocr fallback
+OCR_FALLBACK = os.getenv("CONTRACT_OCR_FALLBACK", "1") != "0"
+OCR_DPI = _env_int("CONTRACT_OCR_DPI", 300)
+OCR_LANG = os.getenv("CONTRACT_OCR_LANG", "eng")
+#a page needs at least this many non-space characters in its text layer
+TEXT_LAYER_MIN_CHARS = _env_int("CONTRACT_TEXT_LAYER_MIN_CHARS", 25)
+#and at least this many glyphs per square inch of page area
+TEXT_LAYER_MIN_DENSITY = float(os.getenv("CONTRACT_TEXT_LAYER_MIN_DENSITY", "0.5"))
+
+#on-disk caches shared by every session and process on the machine
+CACHE_DIR = os.getenv("CONTRACT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "contract_quitter"))
+EXTRACTION_CACHE_MAX_MB = _env_int("CONTRACT_EXTRACTION_CACHE_MAX_MB", 256)
+LLM_CACHE_MAX_MB = _env_int("CONTRACT_LLM_CACHE_MAX_MB", 64)
+LLM_CACHE_TTL_SECONDS = _env_int("CONTRACT_LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+
+#token budget per chunk sent to the model and how many chunks are analyzed at once
+LLM_CHUNK_TOKENS = _env_int("CONTRACT_LLM_CHUNK_TOKENS", 3000)
+LLM_MAX_CONCURRENCY = _env_int("CONTRACT_LLM_MAX_CONCURRENCY", 4)
+
+#contracts over the chunk budget are analyzed from their top passages per question (bm25), not the whole text
+PASSAGE_RETRIEVAL = os.getenv("CONTRACT_PASSAGE_RETRIEVAL", "1") != "0"
+PASSAGE_TOKENS = _env_int("CONTRACT_PASSAGE_TOKENS", 200)
+PASSAGE_TOP_K = _env_int("CONTRACT_PASSAGE_TOP_K", 4)
+
+#fields found locally with at least this confidence are not sent to the model
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("CONTRACT_FAST_PATH_MIN_CONFIDENCE", "0.8"))
+
+#"fields" stops reading a pdf once the fast path has every field, "full" reads every page (risk analysis)
+EXTRACTION_MODE = os.getenv("CONTRACT_EXTRACTION_MODE", "fields")
+EARLY_EXIT_MIN_CONFIDENCE = float(os.getenv("CONTRACT_EARLY_EXIT_MIN_CONFIDENCE", str(FAST_PATH_MIN_CONFIDENCE)))
+
+#drop repeated page headers and footers and collapse whitespace before text is sent to the model
+TEXT_COMPACTION = os.getenv("CONTRACT_TEXT_COMPACTION", "1") != "0"
+
+#structured extraction: fields come back as function-call json instead of "Label: value" lines
+LLM_STRUCTURED_OUTPUT = os.getenv("CONTRACT_LLM_STRUCTURED_OUTPUT", "1") != "0"
+LLM_STRUCTURED_MAX_TOKENS = _env_int("CONTRACT_LLM_STRUCTURED_MAX_TOKENS", 150)
+#rounds per document, every round after the first asks only for the fields still missing
+LLM_STRUCTURED_ATTEMPTS = _env_int("CONTRACT_LLM_STRUCTURED_ATTEMPTS", 2)
+
+#openai gateway: requests in flight, request rate, retries and per-call deadline
+LLM_MAX_IN_FLIGHT = _env_int("CONTRACT_LLM_MAX_IN_FLIGHT", 8)
+LLM_REQUESTS_PER_MINUTE = _env_int("CONTRACT_LLM_REQUESTS_PER_MINUTE", 200)
+LLM_MAX_RETRIES = _env_int("CONTRACT_LLM_MAX_RETRIES", 4)
+LLM_TIMEOUT_SECONDS = float(os.getenv("CONTRACT_LLM_TIMEOUT_SECONDS", "60"))
+
+#image ocr service: worker processes, seconds allowed per image and the quality profile
+OCR_WORKERS = _env_int("CONTRACT_OCR_WORKERS", os.cpu_count() or 1)
+OCR_TIMEOUT_SECONDS = _env_int("CONTRACT_OCR_TIMEOUT_SECONDS", 60)
+OCR_PROFILE = os.getenv("CONTRACT_OCR_PROFILE", "balanced")
+#"tesserocr" keeps one loaded tesseract engine per worker when tesserocr is installed, "pytesseract" spawns the cli per call
+OCR_BACKEND = os.getenv("CONTRACT_OCR_BACKEND", "tesserocr")
+#loaded tesserocr engines per language and config in one process, calls beyond this wait for a free engine
+OCR_ENGINES = _env_int("CONTRACT_OCR_ENGINES", os.cpu_count() or 1)
+#tessdata directory for tesserocr, empty uses the one tesseract was built with
+TESSDATA_DIR = os.getenv("CONTRACT_TESSDATA_DIR", "")
+#in "fields" mode images are first read only in the text blocks of this top share of the page
+OCR_REGIONS = os.getenv("CONTRACT_OCR_REGIONS", "1") != "0"
+OCR_REGION_TOP_FRACTION = float(os.getenv("CONTRACT_OCR_REGION_TOP_FRACTION", "0.4"))
+
+#signatures: where script fonts for the local renderer live (none are bundled, the default font is slanted instead),
+#and the latency to expect from dall-e
+SIGNATURE_FONT_DIR = os.getenv("CONTRACT_SIGNATURE_FONT_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts"))
+SIGNATURE_REMOTE_LATENCY_SECONDS = float(os.getenv("CONTRACT_SIGNATURE_REMOTE_LATENCY_SECONDS", "15"))
+SIGNATURE_CACHE_MAX_MB = _env_int("CONTRACT_SIGNATURE_CACHE_MAX_MB", 64)
+
+#background jobs: sqlite queue, uploads and outputs live under this directory
+JOBS_DIR = os.getenv("CONTRACT_JOBS_DIR", os.path.join(CACHE_DIR, "jobs"))
+JOB_WORKERS = _env_int("CONTRACT_JOB_WORKERS", 4)
+#finished jobs, their uploads and outputs are deleted after this many seconds, 0 keeps them
+JOB_RETENTION_SECONDS = _env_int("CONTRACT_JOB_RETENTION_SECONDS", 24 * 3600)
+#pages parsed ahead of the consumer when streaming, bounds the memory held by the pool
+PDF_STREAM_WINDOW_PAGES = _env_int("CONTRACT_PDF_STREAM_WINDOW_PAGES", 40)
+
+#uploads larger than this are spooled to a temporary file and parsed from disk
+INGEST_SPOOL_THRESHOLD_MB = _env_int("CONTRACT_INGEST_SPOOL_THRESHOLD_MB", 8)
+#longest edge of the preview shown for uploaded images
+PREVIEW_MAX_PIXELS = _env_int("CONTRACT_PREVIEW_MAX_PIXELS", 1024)
+
+#in-process metrics; when disabled every span and counter returns immediately
+METRICS_ENABLED = os.getenv("CONTRACT_METRICS", "0") == "1"
@@ -1,15 +1,80 @@
-import re
-from PIL import Image
-import pytesseract
-import pdfplumber
-from pdf2image import convert_from_path
-from fpdf import FPDF
-import openai
-import os
-from datetime import datetime
-import requests
-import streamlit as st
-import io
+#headless core: streamlit is never imported here, pdf, ocr and openai libraries load on first use
+from pdf_engine import PDFExtractionEngine, load_source
+from extraction_cache import ExtractionCache
+from disk_cache import sha256_of
+from llm_cache import get_response_cache
+from chunking import PAGE_SEPARATOR, chunk_text, estimate_tokens
+from concurrent.futures import ThreadPoolExecutor
+import config
+from fast_path import detect_fields
+from compaction import compact_text
+from passage_index import select_passages
+from structured_output import ContractInfo, contract_function, parse_arguments
+from metrics import count, observe, traced
+
+#labels the model is asked to answer with, mapped to the extracted_info keys
+CONTRACT_FIELDS = {
+    "Company:": "company",
+    "Contract Number:": "contract_number",
+    "Date of Birth:": "date_of_birth",
+    "Quitting Party:": "quitting_party"
+}
+
+
+#pdf extraction modes: stop once every field is found, or read the whole document
+FIELDS_MODE = "fields"
+FULL_MODE = "full"
+
+
+#how each field is described to the model
+FIELD_DESCRIPTIONS = {
+    "company": "company",
+    "contract_number": "contract number",
+    "date_of_birth": "date of birth",
+    "quitting_party": "quitting party as a name of the person"
+}
+
+
+#"the company, contract number, and date of birth" for the requested fields
+def describe_fields(fields):
+    descriptions = [FIELD_DESCRIPTIONS[key] for key in fields]
+    if len(descriptions) == 1:
+        return f"the {descriptions[0]}"
+    if len(descriptions) == 2:
+        return f"the {descriptions[0]} and {descriptions[1]}"
+    return "the " + ", ".join(descriptions[:-1]) + f", and {descriptions[-1]}"
+
+
+def empty_contract_info():
+    return {key: [] for key in CONTRACT_FIELDS.values()}
+
+
+#parse the "Label: value" lines of a model answer into the extracted_info dict
+def parse_contract_info(analysis_result):
+    extracted_info = empty_contract_info()
+    for line in analysis_result.split('\n'):
+        for label, key in CONTRACT_FIELDS.items():
+            if label in line:
+                extracted_info[key].append(line.split(label)[1].strip())
+                break
+    return extracted_info
+
+
+#true when the fast-path matches hold every field with at least min_confidence
+def fields_settled(matches, min_confidence):
+    return all(key in matches and matches[key].confidence >= min_confidence for key in FIELD_DESCRIPTIONS)
+
+
+#merge per-chunk results in chunk order, dropping empty and repeated values
+def merge_contract_info(results):
+    merged = empty_contract_info()
+    for result in results:
+        for key, values in result.items():
+            for value in values:
+                if value and value not in merged[key]:
+                    merged[key].append(value)
+    return merged
+
 
 #create class for data extraction
 class DataExtractor:
@@ -17,87 +82,286 @@ class DataExtractor:
         self.file_path = file_path
         self.file_type = file_type
         self.image_path = None
+        self.pdf_engine = PDFExtractionEngine()
+        self.extraction_cache = ExtractionCache()
+        self.response_cache = get_response_cache()
+        # confidence of the fields filled by the rule-based fast path in the last analysis
+        self.field_confidence = {}
+        # per-stage timings of the last image ocr
+        self.ocr_timings = {}
+        # typed result of the last structured extraction
+        self.contract_info = None
+        # CompactText of the last analyzed text, maps prompt offsets back to the original pages
+        self.compacted = None
 
-    #extract text from image using pytesseract
-    def extract_text_from_image(self):
+    def _ocr(self, source, regions):
+        from ocr_service import get_ocr_service
+
+        result = get_ocr_service().ocr_image(source, regions)
+        self.ocr_timings = result.timings
+        for stage, seconds in result.timings.items():
+            observe(f"ocr.{stage}", seconds)
+        if result.error:
+            raise RuntimeError(result.error)
+        observe("ocr.coverage", result.coverage)
+        return result.text
+
+    #header text blocks only, with field values read using field-specific tesseract settings
+    def _ocr_regions(self, source):
+        text = self._ocr(source, regions=True)
+        matches = detect_fields(text)
+        return text, matches, fields_settled(matches, config.EARLY_EXIT_MIN_CONFIDENCE)
+
+    #extract text from image using pytesseract, the image is normalized and read in a worker process
+    #in "fields" mode the header regions are read first, the whole page only when they miss a field
+    @traced("extractor.extract_text_from_image")
+    def extract_text_from_image(self, mode=None):
         try:
-            image = Image.open(self.image_path)
-            text = pytesseract.image_to_string(image)
-            return text
+            source = load_source(self.image_path)
+            if (mode or config.EXTRACTION_MODE) == FIELDS_MODE and config.OCR_REGIONS:
+                text, matches, settled = self._ocr_regions(source)
+                if settled:
+                    count("ocr.region_hits")
+                    return text
+                count("ocr.region_fallbacks")
+            return self._ocr(source, regions=False)
         except Exception as e:
+            count("errors.extract_text_from_image")
             print(f"Error extracting text from image: {e}")
             return None
+
+    #extracted_info straight from the header regions of the image, no model call; fields not found there stay empty
+    @traced("extractor.extract_fields_from_image")
+    def extract_fields_from_image(self):
+        try:
+            text, matches, settled = self._ocr_regions(load_source(self.image_path))
+            extracted_info = empty_contract_info()
+            for key, match in matches.items():
+                if match.confidence >= config.EARLY_EXIT_MIN_CONFIDENCE:
+                    extracted_info[key] = [match.value]
+            return extracted_info
+        except Exception as e:
+            count("errors.extract_fields_from_image")
+            print(f"Error extracting fields from image: {e}")
+            return None
         
-    def extract_text_from_pdf(self):
+    #yield page results as they are extracted, the cache is filled once the last page is read
+    #a reader that stops early leaves the pages it read as a prefix entry, the next read continues after them
+    #parallel=False parses page by page, see PDFExtractionEngine.iter_pages
+    def iter_pages_from_pdf(self, parallel=True):
+        source = load_source(self.file_path)
+        # repeat uploads of the same document skip parsing and ocr
+        document_hash = sha256_of(source)
+        pages = self.extraction_cache.get(document_hash, self.pdf_engine)
+        if pages is not None:
+            count("extraction_cache.hit")
+            yield from pages
+            return
+        pages = self.extraction_cache.get_prefix(document_hash, self.pdf_engine) or []
+        count("extraction_cache.prefix_hit" if pages else "extraction_cache.miss")
+        cached = len(pages)
+        complete = False
         try:
-            text = ""
-            with pdfplumber.open(self.file_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text()
-            return text
+            yield from list(pages)
+            for page in self.pdf_engine.iter_pages(source, first_page=cached, parallel=parallel):
+                # page timings come from the workers, pdfplumber and ocr pages are told apart by method
+                count("pdf.pages")
+                if page.method == "ocr":
+                    count("pdf.ocr_fallback_pages")
+                observe(f"pdf.page.{page.method}", page.seconds)
+                pages.append(page)
+                yield page
+            complete = True
+        finally:
+            if complete:
+                self.extraction_cache.put(document_hash, self.pdf_engine, pages)
+            elif len(pages) > cached:
+                self.extraction_cache.put_prefix(document_hash, self.pdf_engine, pages)
+
+    #pages in order until the fast path has found every field, later pages are never parsed or ocr'd
+    def iter_field_pages_from_pdf(self, min_confidence=None):
+        min_confidence = config.EARLY_EXIT_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        texts = []
+        # the pool would parse a whole window of pages ahead, most of them past the early exit
+        pages = self.iter_pages_from_pdf(parallel=False)
+        try:
+            for page in pages:
+                texts.append(page.text)
+                yield page
+                if fields_settled(detect_fields(PAGE_SEPARATOR.join(texts)), min_confidence):
+                    count("pdf.early_exit")
+                    return
+        finally:
+            # closing the page stream stores the pages read so far as a cache prefix
+            pages.close()
+
+    #mode "fields" (FIELDS_MODE) stops after the page that completes the fields, "full" (FULL_MODE) reads every page
+    def iter_pages_for_mode(self, mode=None):
+        mode = mode or config.EXTRACTION_MODE
+        if mode == FULL_MODE:
+            return self.iter_pages_from_pdf()
+        return self.iter_field_pages_from_pdf()
+
+    #per-page results with the path (text layer or ocr) and timing of every page
+    @traced("extractor.extract_pages_from_pdf")
+    def extract_pages_from_pdf(self, mode=None):
+        try:
+            return list(self.iter_pages_for_mode(mode))
         except Exception as e:
-            print(f"Error extracting text from PDF: {e}")
+            count("errors.extract_pages_from_pdf")
+            print(f"Error extracting pages from PDF: {e}")
             return None
+
+    #use mode="full" when the whole contract is analyzed, e.g. for a risk assessment
+    def extract_text_from_pdf(self, mode=None):
+        pages = self.extract_pages_from_pdf(mode)
+        if pages is None:
+            return None
+        return PAGE_SEPARATOR.join(page.text for page in pages)
         
     
-    def analyze_and_extract_contract_info(self, text):
+    #split long contracts into chunks within the token budget, short ones stay a single chunk
+    def _chunks(self, text):
+        if estimate_tokens(text) <= config.LLM_CHUNK_TOKENS:
+            return [text]
+        return chunk_text(text, config.LLM_CHUNK_TOKENS)
+
+    #run one analysis per chunk concurrently, results come back in chunk order
+    def _map_chunks(self, analyze_chunk, chunks):
+        if len(chunks) == 1:
+            return [analyze_chunk(chunks[0])]
+        with ThreadPoolExecutor(max_workers=min(config.LLM_MAX_CONCURRENCY, len(chunks))) as pool:
+            return list(pool.map(analyze_chunk, chunks))
+
+    def _extract_chunk_info(self, chunk, fields, use_cache):
+        # Define the messages for the API request
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": f"Analyze the following contract text and extract {describe_fields(fields)}:\n\n{chunk}\n\n"}
+        ]
+
+        # Call the OpenAI API to analyze the contract text, identical requests are served from the cache
+        analysis_result = self.response_cache.chat_completion("gpt-4", messages, 500, use_cache=use_cache)
+        return parse_contract_info(analysis_result)
+
+    #strip repeated headers and footers, hyphenation and extra whitespace before the text goes into a prompt
+    def _compact(self, text):
+        if not config.TEXT_COMPACTION:
+            self.compacted = None
+            return text
+        self.compacted = compact_text(text)
+        count("compaction.removed_lines", self.compacted.removed_lines)
+        count("compaction.tokens_saved", self.compacted.tokens_saved)
+        return self.compacted.text
+
+    #original page of every extracted value, None for values not found verbatim in the analyzed text
+    def field_pages(self, extracted_info):
+        if self.compacted is None:
+            return {}
+        return {key: [self.compacted.page_of_value(value) for value in values] for key, values in extracted_info.items()}
+
+    #fields the deterministic rules settle, the model is only asked for the rest
+    def _fast_path(self, text):
+        confident = {
+            key: match for key, match in detect_fields(text).items()
+            if match.confidence >= config.FAST_PATH_MIN_CONFIDENCE
+        }
+        self.field_confidence = {key: match.confidence for key, match in confident.items()}
+        count("fast_path.fields", len(confident))
+        return confident
+
+    #passes > 0 says the fields were missed before, a repeat of unchanged fields would otherwise hit the cached answer
+    def _extract_chunk_fields(self, chunk, fields, use_cache, passes=0):
+        request = f"Extract {describe_fields(fields)} from the following contract text"
+        if passes:
+            request += (f". {passes} earlier pass(es) did not find them, read the text again carefully,"
+                        " including headers, tables and footnotes")
+        messages = [
+            {"role": "system", "content": "You extract fields from contracts. Answer only by calling the function, use null for a field the text does not state."},
+            {"role": "user", "content": f"{request}:\n\n{chunk}\n\n"}
+        ]
+        function = contract_function({key: FIELD_DESCRIPTIONS[key] for key in fields})
+        arguments = self.response_cache.chat_completion("gpt-4", messages, config.LLM_STRUCTURED_MAX_TOKENS, use_cache=use_cache, functions=[function])
+        values = parse_arguments(arguments, fields)
+        if values is None:
+            count("structured.invalid_responses")
+            return {}
+        return values
+
+    #rules first, then one function call per chunk for the rest; later rounds ask only for the fields still missing
+    def _extract_structured(self, text, use_cache):
+        info = ContractInfo()
+        info.fill({key: match.value for key, match in self._fast_path(text).items()})
+        chunks = self._chunks(text)
+        for attempt in range(config.LLM_STRUCTURED_ATTEMPTS):
+            missing = info.missing()
+            if not missing:
+                break
+            if attempt:
+                count("structured.rerequested_fields", len(missing))
+            # repeats name the earlier passes, so their prompts and cache keys differ from the first round
+            results = self._map_chunks(lambda chunk: self._extract_chunk_fields(chunk, missing, use_cache, attempt), chunks)
+            # the first chunk that states a field wins
+            for values in results:
+                info.fill(values)
+        self.contract_info = info
+        return info
+
+    #typed ContractInfo for the text, None on errors
+    @traced("extractor.extract_contract_fields")
+    def extract_contract_fields(self, text, use_cache=True):
+        try:
+            return self._extract_structured(self._compact(text), use_cache)
+        except Exception as e:
+            count("errors.extract_contract_fields")
+            print(f"Error extracting contract fields: {e}")
+            return None
+
+    #use_cache=False skips the response cache and forces a fresh completion
+    #structured=False falls back to the free-text answer scanned for "Label: value" lines
+    @traced("extractor.analyze_and_extract_contract_info")
+    def analyze_and_extract_contract_info(self, text, use_cache=True, structured=None):
+        structured = config.LLM_STRUCTURED_OUTPUT if structured is None else structured
         try:
-            # Define the messages for the API request
-            messages = [
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": f"Analyze the following contract text and extract the company, contract number, date of birth, and quitting party as a name of the person:\n\n{text}\n\n"}
-            ]
-
-            # Call the OpenAI API to analyze the contract text
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=messages,
-                max_tokens=500
-            )
-
-            # Extract the response content
-            analysis_result = response.choices[0].message["content"].strip()
-
-            # Initialize the dictionary to store the extracted information
-            extracted_info = {
-                "company": [],
-                "contract_number": [],
-                "date_of_birth": [],
-                "quitting_party": []
-            }
-
-            # Parsing logic based on the expected format of analysis_result
-            lines = analysis_result.split('\n')
-            for line in lines:
-                if "Company:" in line:
-                    extracted_info["company"].append(line.split("Company:")[1].strip())
-                elif "Contract Number:" in line:
-                    extracted_info["contract_number"].append(line.split("Contract Number:")[1].strip())
-                elif "Date of Birth:" in line:
-                    extracted_info["date_of_birth"].append(line.split("Date of Birth:")[1].strip())
-                elif "Quitting Party:" in line:
-                    extracted_info["quitting_party"].append(line.split("Quitting Party:")[1].strip())
+            text = self._compact(text)
+            if structured:
+                return self._extract_structured(text, use_cache).to_extracted_info()
 
+            confident = self._fast_path(text)
+            missing = [key for key in FIELD_DESCRIPTIONS if key not in confident]
+
+            extracted_info = empty_contract_info()
+            if missing:
+                results = self._map_chunks(lambda chunk: self._extract_chunk_info(chunk, missing, use_cache), self._chunks(text))
+                extracted_info = merge_contract_info(results)
+            for key, match in confident.items():
+                extracted_info[key] = [match.value]
             return extracted_info
 
         except Exception as e:
+            count("errors.analyze_and_extract_contract_info")
             print(f"Error analyzing contract: {e}")
             return None
-        
-    def analyze_contract(self, text):
+
+    def _analyze_chunk(self, chunk, use_cache):
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": f"Analyze the following contract text and extract the contract party, contract number, date of birth, and quitting party:\n\n{chunk}\n\n"}
+        ]
+        return self.response_cache.chat_completion("gpt-4", messages, 500, use_cache=use_cache)
+
+    #long contracts are analyzed from their most relevant passages, the prompt size stays about constant
+    @traced("extractor.analyze_contract")
+    def analyze_contract(self, text, use_cache=True):
         try:
-            messages = [
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": f"Analyze the following contract text and extract the contract party, contract number, date of birth, and quitting party:\n\n{text}\n\n"}
-            ]
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=messages,
-                max_tokens=500
-            )
-            analysis_result = response.choices[0].message["content"].strip()
+            text = self._compact(text)
+            if config.PASSAGE_RETRIEVAL:
+                text = select_passages(text, ["parties", "identifiers", "termination"])
+            results = self._map_chunks(lambda chunk: self._analyze_chunk(chunk, use_cache), self._chunks(text))
+            analysis_result = "\n\n".join(result for result in results if result)
             return analysis_result
         except Exception as e:
+            count("errors.analyze_contract")
             print(f"Error analyzing contract: {e}")
             return None
         
@@ -105,115 +369,36 @@ class DataExtractor:
         name = analysis_result['name'][0]
         return name
         
-    def generate_signature(self, name):
-        prompt = (
-            f"Generate a realistic handwritten signature for the name '{name}'. "
-            "The signature should be elegant, clear, and written in a cursive style. "
-            "The background should be transparent, and the signature should be centered "
-            "with no additional text or decorations. Ensure that the handwriting appears "
-            "natural and fluid, resembling an authentic signature."
-        )
-
-        response = openai.Image.create(
-            prompt=prompt,
-            n=1,
-            size="256x256"
-        )
-
-        image_url = response['data'][0]['url']
-        
-        # Download the image
-        image_response = requests.get(image_url)
-        image = Image.open(io.BytesIO(image_response.content))
-        
-        # Convert image to binary format
-        img_byte_arr = io.BytesIO()
-        image.save(img_byte_arr, format='PNG')
-        img_byte_arr = img_byte_arr.getvalue()
-        
-        return img_byte_arr
-    
+    #png bytes of a signature for name, latency_budget (seconds) below the dall-e latency selects the local renderer
+    @traced("extractor.generate_signature")
+    def generate_signature(self, name, style="cursive", latency_budget=None):
+        from signatures import get_signature_provider
 
+        return get_signature_provider().get(name, style=style, latency_budget=latency_budget)
 
-    def generate_termination_pdf(data, signature_path_or_data):
-        contract_number = data['contract_number'][0] if isinstance(data['contract_number'], list) and data['contract_number'] else ''
-        company = data['company'][0] if isinstance(data['company'], list) and data['company'] else ''
-        quitting_party = data['quitting_party'][0] if isinstance(data['quitting_party'], list) and data['quitting_party'] else ''
-        
-        date_pattern = re.compile(r'\b\d{2}\.\d{2}\.\d{4}\b')
-        if isinstance(data['date_of_birth'], list) and data['date_of_birth']:
-            candidate = data['date_of_birth'][0]
-            if date_pattern.match(candidate):
-                date_of_birth = candidate
-            else:
-                date_of_birth = None
-        else:
-            date_of_birth = None
+    #language picks the letter template, "en" or "de"
+    @traced("extractor.generate_termination_pdf")
+    def generate_termination_pdf(data, signature_path_or_data, language="en"):
+        from letter_templates import get_template
 
         try:
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=12)
-
-            # Add contract party information
-            pdf.cell(200, 10, txt="", ln=True)  # Empty line
-
-            # Add company and contract number information
-            pdf.cell(200, 10, txt=f"{company}", ln=True)
-            pdf.cell(200, 10, txt=" ", ln=True)
-            pdf.cell(200, 10, txt=" ", ln=True)
-            pdf.cell(200, 10, txt=" ", ln=True)
-            pdf.cell(200, 10, txt="", ln=True)  # Empty line
-
-            # Add contract number and date of birth information
-            pdf.cell(200, 10, txt=f"Contract Number: {contract_number}", ln=True)
-
-            if date_of_birth is not None:
-                pdf.cell(200, 10, txt=f"Date of Birth: {date_of_birth}", ln=True)
-
-            pdf.cell(200, 10, txt="", ln=True)  # Empty line
-
-            # Add termination information
-            pdf.set_font("Arial", size=14, style='B')
-            pdf.cell(200, 10, txt="Termination at the next possible date", ln=True)
-            pdf.set_font("Arial", size=12)
-            today_date = datetime.today().strftime('%d.%m.%Y')
-            pdf.cell(200, 10, txt=today_date, ln=True, align='R')
-            pdf.cell(200, 10, txt="", ln=True)  # Empty line
-            pdf.cell(200, 10, txt="", ln=True)  # Empty line
-
-            # Add termination letter content
-            pdf.multi_cell(200, 10, txt="Dear Sir or Madam,\n\n"
-                                        "I hereby give notice of termination of my contract with effect from the next possible date. \n"
-                                        "Please send me a written confirmation of the termination stating the date of termination.\n\n"
-                                        "Never text here again.\n\n")
-            pdf.set_font("Arial", size=16, style='B')
-            pdf.cell(200, 10, txt=f"{quitting_party}", ln=True)
-            pdf.set_font("Arial", size=12)
-            pdf.cell(200, 10, txt=f"{quitting_party}", ln=True)
-
-            # Handle signature image
-            if isinstance(signature_path_or_data, str):
-                # If it's a file path
-                image_path = signature_path_or_data
-            else:
-                # If it's image data
-                signature_io = io.BytesIO(signature_path_or_data)
-                image = Image.open(signature_io)
-                image_path = "signature_temp.png"
-                image.save(image_path)
-
-            pdf.ln(10)
-            pdf.image(image_path, x=10, y=pdf.get_y(), w=50)
-
-            # Save PDF to a binary stream
-            pdf_output = io.BytesIO()
-            pdf_content = pdf.output(dest='S').encode('latin1')
-            pdf_output.write(pdf_content)
-            pdf_output.seek(0)
-
-            return pdf_output.read()
+            # the template holds the static layout, only the fields and signature are filled in here
+            return get_template(language).render_pdf(data, signature_path_or_data)
 
         except Exception as e:
+            count("errors.generate_termination_pdf")
             print(f"Error generating PDF: {e}")
             return None
+
+    #render many (data, signature) letters in one pass, as a list of pdfs or one merged pdf
+    @traced("extractor.generate_termination_pdfs")
+    def generate_termination_pdfs(letters, language="en", merged=False):
+        from letter_templates import get_template
+
+        try:
+            return get_template(language).render_many(letters, merged=merged)
+
+        except Exception as e:
+            count("errors.generate_termination_pdfs")
+            print(f"Error generating PDFs: {e}")
+            return None
@@ -0,0 +1,46 @@
+import os
+from dataclasses import asdict
+
+import config
+from chunking import PAGE_SEPARATOR
+from disk_cache import DiskCache
+from pdf_engine import EXTRACTOR_VERSION, PageResult
+
+
+#cache of extracted text and page results keyed by the document hash and extractor settings
+class ExtractionCache:
+    def __init__(self, directory=None, max_bytes=None):
+        directory = directory or os.path.join(config.CACHE_DIR, "extraction")
+        max_bytes = max_bytes or config.EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+        self.store = DiskCache(directory, max_bytes)
+
+    def key(self, document_hash, engine):
+        # results depend on the ocr settings and the text layer thresholds that pick ocr pages as well as the document
+        return (
+            f"{document_hash}-v{EXTRACTOR_VERSION}-ocr{int(engine.ocr_fallback)}-{engine.dpi}-{engine.lang}"
+            f"-{engine.min_chars}-{engine.min_density}"
+        )
+
+    def get(self, document_hash, engine):
+        entry = self.store.get(self.key(document_hash, engine))
+        if entry is None:
+            return None
+        return [PageResult(**page) for page in entry["pages"]]
+
+    def put(self, document_hash, engine, pages):
+        entry = {
+            "text": PAGE_SEPARATOR.join(page.text for page in pages),
+            "pages": [asdict(page) for page in pages],
+        }
+        self.store.set(self.key(document_hash, engine), entry)
+        self.store.delete(self.key(document_hash, engine) + "-prefix")
+
+    #leading pages of a document whose reading stopped early, a later read goes on from there
+    def get_prefix(self, document_hash, engine):
+        entry = self.store.get(self.key(document_hash, engine) + "-prefix")
+        if entry is None:
+            return None
+        return [PageResult(**page) for page in entry["pages"]]
+
+    def put_prefix(self, document_hash, engine, pages):
+        self.store.set(self.key(document_hash, engine) + "-prefix", {"pages": [asdict(page) for page in pages]})
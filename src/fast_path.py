@@ -0,0 +1,111 @@
+import re
+from dataclasses import dataclass
+
+
+#dates are written DD.MM.YYYY on the contracts we handle
+DATE_PATTERN = re.compile(r'\b\d{2}\.\d{2}\.\d{4}\b')
+
+_birth_date_label = r'(date of birth|birth date|born|geburtsdatum|geboren am|geb\.)'
+_contract_number_label = (
+    r'(contract (?:number|no\.?)|policy (?:number|no\.?)|vertragsnummer|vertrags-nr\.?|versicherungsnummer|'
+    r'vers\.-nr\.?|versicherungsschein-nr\.?|kundennummer)'
+)
+_birth_date = re.compile(_birth_date_label + r'\s*:?\s*(\d{2}\.\d{2}\.\d{4})', re.IGNORECASE)
+_contract_number = re.compile(_contract_number_label + r'\s*:?\s*([A-Z0-9][A-Z0-9\-/.]{3,})', re.IGNORECASE)
+
+#labels that introduce a field value on the same line
+FIELD_LABELS = {
+    "contract_number": re.compile(_contract_number_label + r'\s*:?', re.IGNORECASE),
+    "date_of_birth": re.compile(_birth_date_label + r'\s*:?', re.IGNORECASE)
+}
+
+_legal_form = r'(?:GmbH|AG|SE|KG|KGaA|mbH|VVaG|Inc\.?|Ltd\.?|LLC|plc)'
+#one to four capitalised words followed by a legal form or "Versicherung"/"Insurance": "Musterversicherung AG"
+_company_name = r'((?:[A-ZÄÖÜ0-9&][\w&.\-]*[ \t]+){1,4}(?:' + _legal_form + r'|Versicherung(?:en)?|Insurance))(?![\w])'
+_company = re.compile(r'(?<![\w&.\-])' + _company_name)
+_company_label = re.compile(
+    r'(?i:\b(insurer|insurance company|company name|company|versicherer|versicherungsgesellschaft|firmenname|firma)\b)'
+    r'[ \t]*:[ \t]*' + _company_name
+)
+#a letterhead line that holds nothing but the company name, and the name ends in a legal form
+_letterhead = re.compile(r'^[ \t]*' + _company_name + r'[ \t]*$', re.MULTILINE)
+_name = r'([A-ZÄÖÜ][a-zäöüß]+(?:[\- ][A-ZÄÖÜ][a-zäöüß]+)+)'
+#person labels only, a generic "name" would also match "Company name" or "Firmenname"
+_party = re.compile(
+    r'(?i:\b(policyholder|policy holder|customer name|insured person|name of the policyholder|'
+    r'versicherungsnehmer(?:in|s)?|name des versicherungsnehmers|kunde|kundin|vor- und nachname)\b)\s*:?\s*' + _name
+)
+_salutation = re.compile(r'\b(Herr|Frau|Mr\.?|Mrs\.?|Ms\.?)\s+' + _name)
+
+
+#a value found by the rules and how sure the rule is about it
+@dataclass
+class FieldMatch:
+    value: str
+    confidence: float
+
+
+def _find_date_of_birth(text):
+    match = _birth_date.search(text)
+    if match:
+        return FieldMatch(match.group(2), 0.95)
+    # a bare date may as well be the contract start
+    match = DATE_PATTERN.search(text)
+    if match:
+        return FieldMatch(match.group(0), 0.4)
+    return None
+
+
+def _find_contract_number(text):
+    match = _contract_number.search(text)
+    if match:
+        value = match.group(2).rstrip(".")
+        # labels followed by a plain word are not numbers
+        confidence = 0.9 if any(c.isdigit() for c in value) else 0.3
+        return FieldMatch(value, confidence)
+    return None
+
+
+#only a labelled name or a letterhead line of its own is sure enough to skip the model,
+#"Your Car Insurance" or "Home Insurance Policy Schedule" are headings rather than companies
+def _find_company(text):
+    match = _company_label.search(text)
+    if match:
+        return FieldMatch(match.group(2).strip(), 0.9)
+    # the letterhead is at the top, look at the first lines only
+    header = "\n".join(text.splitlines()[:25])
+    for match in _letterhead.finditer(header):
+        if re.search(_legal_form + r'$', match.group(1)):
+            return FieldMatch(match.group(1).strip(), 0.85)
+    match = _company.search(text)
+    if match:
+        return FieldMatch(match.group(1).strip(), 0.6)
+    return None
+
+
+def _find_quitting_party(text):
+    match = _party.search(text)
+    if match:
+        return FieldMatch(match.group(2), 0.85)
+    match = _salutation.search(text)
+    if match:
+        return FieldMatch(match.group(2), 0.7)
+    return None
+
+
+_finders = {
+    "company": _find_company,
+    "contract_number": _find_contract_number,
+    "date_of_birth": _find_date_of_birth,
+    "quitting_party": _find_quitting_party
+}
+
+
+#run every rule over the text, fields without a match are left out
+def detect_fields(text):
+    matches = {}
+    for key, finder in _finders.items():
+        match = finder(text)
+        if match is not None:
+            matches[key] = match
+    return matches
@@ -0,0 +1,50 @@
+import argparse
+import json
+import subprocess
+import sys
+
+#modules that must import without streamlit, the cli and the job workers use them headless
+HEADLESS_MODULES = ["data_extraction", "batch", "jobs"]
+
+#libraries that are only needed once a document is actually processed
+HEAVY_MODULES = ["streamlit", "pdfplumber", "pytesseract", "fpdf", "openai", "aiohttp", "tiktoken", "pandas"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+#import module in a fresh interpreter, returns the import wall time and the heavy libraries it pulled in
+def measure(module):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold import time of the headless core")
+    parser.add_argument("modules", nargs="*", default=HEADLESS_MODULES)
+    parser.add_argument("--budget", type=float, default=0.3, help="seconds allowed per module import")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        report = measure(module)
+        problems = []
+        if report["seconds"] > args.budget:
+            problems.append(f"over budget ({args.budget:.2f}s)")
+        if report["loaded"]:
+            problems.append("imports " + ", ".join(report["loaded"]))
+        failed = failed or bool(problems)
+        print(f"{module:<20} {report['seconds'] * 1000:8.1f} ms  {'; '.join(problems) or 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
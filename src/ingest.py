@@ -0,0 +1,82 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+
+import config
+
+
+_BLOCK_SIZE = 1 << 20
+
+
+#an upload copied once in blocks: small ones stay in memory, large ones are spooled to a temp file
+#the sha256 is computed during the copy so nothing reads the upload twice
+class SpooledUpload:
+    def __init__(self, fileobj, name="upload", threshold=None):
+        self.name = name
+        self.threshold = config.INGEST_SPOOL_THRESHOLD_MB * 1024 * 1024 if threshold is None else threshold
+        self.path = None
+        self.data = None
+        self.size = 0
+        self._spool(fileobj)
+
+    def _spool(self, fileobj):
+        digest = hashlib.sha256()
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+        memory = io.BytesIO()
+        spooled = None
+        for block in iter(lambda: fileobj.read(_BLOCK_SIZE), b""):
+            digest.update(block)
+            self.size += len(block)
+            if spooled is None and self.size > self.threshold:
+                suffix = os.path.splitext(self.name)[1]
+                spooled = tempfile.NamedTemporaryFile(prefix="upload_", suffix=suffix, delete=False)
+                spooled.write(memory.getbuffer())
+                memory = None
+            if spooled is not None:
+                spooled.write(block)
+            else:
+                memory.write(block)
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+        if spooled is not None:
+            spooled.close()
+            self.path = spooled.name
+        else:
+            self.data = memory.getvalue()
+        self.sha256 = digest.hexdigest()
+
+    #what the parsers get: a path for spooled uploads (reopened by worker processes), bytes otherwise
+    @property
+    def source(self):
+        return self.path if self.path is not None else self.data
+
+    def copy_to(self, destination):
+        if self.path is not None:
+            shutil.copyfile(self.path, destination)
+        else:
+            with open(destination, "wb") as f:
+                f.write(self.data)
+
+    def close(self):
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+#downscaled preview, jpeg uploads are decoded at reduced size instead of in full
+def make_thumbnail(source, max_pixels=None):
+    max_pixels = max_pixels or config.PREVIEW_MAX_PIXELS
+    image = Image.open(source)
+    image.draft("RGB", (max_pixels, max_pixels))
+    image.thumbnail((max_pixels, max_pixels))
+    return image
@@ -0,0 +1,219 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from chunking import PAGE_SEPARATOR
+from data_extraction import DataExtractor
+from fast_path import detect_fields
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+#characters of extracted text shown while the rest of the document is still being read
+PREVIEW_CHARS = 500
+#submit looks for expired jobs at most this often
+SWEEP_INTERVAL_SECONDS = 600
+
+#stages a job can run, in order; each one reads and extends the job result
+#and may call report(fraction) to publish partial results while it runs
+ANALYSIS_STAGES = ["extract", "analyze"]
+LETTER_STAGES = ["signature", "pdf"]
+
+
+#stream pages: the preview and fast-path fields are published while later pages are still parsed
+#options["extract_mode"] "full" reads every page, by default reading stops once the fields are found
+def _stage_extract(job, result, extractor, report):
+    path = job["input_path"]
+    if path.lower().endswith(".pdf"):
+        extractor.file_path = path
+        page_count = extractor.pdf_engine.page_count(path)
+        texts = []
+        result["pages"] = []
+        fields = {}
+        for page in extractor.iter_pages_for_mode(job["options"].get("extract_mode")):
+            texts.append(page.text)
+            result["pages"].append({"page_number": page.page_number, "method": page.method, "seconds": page.seconds})
+            if len(fields) < 4:
+                fields = {key: match.value for key, match in detect_fields(PAGE_SEPARATOR.join(texts)).items()}
+                result["fields"] = fields
+            if len(texts) == 1 or sum(len(text) for text in texts[:-1]) < PREVIEW_CHARS:
+                result["preview"] = PAGE_SEPARATOR.join(texts)[:PREVIEW_CHARS]
+            report(len(texts) / page_count)
+        # pages after the one that completed the fields were skipped
+        result["pages_skipped"] = page_count - len(texts)
+        text = PAGE_SEPARATOR.join(texts)
+    else:
+        extractor.image_path = path
+        text = extractor.extract_text_from_image(job["options"].get("extract_mode"))
+    if not text:
+        raise ValueError("Failed to extract any text from the document.")
+    result["text"] = text
+
+
+def _stage_analyze(job, result, extractor, report):
+    data = extractor.analyze_and_extract_contract_info(result["text"], use_cache=job["options"].get("use_cache", True))
+    if not data:
+        raise ValueError("Failed to extract structured data from the document.")
+    result["extracted_info"] = data
+    # page of the contract each value was read from
+    result["field_pages"] = extractor.field_pages(data)
+
+
+def _stage_signature(job, result, extractor, report):
+    name = (result["extracted_info"].get("quitting_party") or [""])[0]
+    signature = extractor.generate_signature(name, latency_budget=job["options"].get("signature_latency_budget"))
+    path = os.path.join(config.JOBS_DIR, "outputs", f"{job['id']}_signature.png")
+    with open(path, "wb") as f:
+        f.write(signature)
+    result["signature_path"] = path
+
+
+def _stage_pdf(job, result, extractor, report):
+    with open(result["signature_path"], "rb") as f:
+        signature = f.read()
+    pdf_bytes = DataExtractor.generate_termination_pdf(result["extracted_info"], signature, job["options"].get("language", "en"))
+    if pdf_bytes is None:
+        raise ValueError("Failed to generate the termination letter.")
+    path = os.path.join(config.JOBS_DIR, "outputs", f"{job['id']}.pdf")
+    with open(path, "wb") as f:
+        f.write(pdf_bytes)
+    result["pdf_path"] = path
+
+
+STAGES = {
+    "extract": _stage_extract,
+    "analyze": _stage_analyze,
+    "signature": _stage_signature,
+    "pdf": _stage_pdf
+}
+
+
+#sqlite-backed job queue; jobs and their partial results survive an app restart
+class JobQueue:
+    def __init__(self, directory=None, workers=None, retention_seconds=None):
+        self.directory = directory or config.JOBS_DIR
+        self.retention_seconds = config.JOB_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+        self._swept = 0.0
+        self.db_path = os.path.join(self.directory, "jobs.sqlite")
+        os.makedirs(os.path.join(self.directory, "uploads"), exist_ok=True)
+        os.makedirs(os.path.join(self.directory, "outputs"), exist_ok=True)
+        self.pool = ThreadPoolExecutor(max_workers=workers or config.JOB_WORKERS, thread_name_prefix="job")
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT, stage TEXT, progress REAL, input_path TEXT, "
+                "stages TEXT, options TEXT, result TEXT, error TEXT, created REAL, updated REAL)"
+            )
+        self._resume()
+        self.sweep()
+
+    #one connection per thread, wal lets the ui read while workers write
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    def _update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", [*fields.values(), job_id])
+
+    #jobs left queued or running by a previous process are picked up again
+    def _resume(self):
+        rows = self._connect().execute("SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created", (QUEUED, RUNNING)).fetchall()
+        for row in rows:
+            self.pool.submit(self._run, row["id"])
+
+    #delete finished jobs older than the retention period together with their upload and output files
+    def sweep(self):
+        self._swept = time.time()
+        if self.retention_seconds <= 0:
+            return 0
+        cutoff = self._swept - self.retention_seconds
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id, input_path, result FROM jobs WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, cutoff)
+            ).fetchall()
+            # rows go first, a session that still holds the id then sees a missing job rather than a missing file
+            db.executemany("DELETE FROM jobs WHERE id = ?", [(row["id"],) for row in rows])
+        for row in rows:
+            result = json.loads(row["result"])
+            for path in (row["input_path"], result.get("signature_path"), result.get("pdf_path")):
+                if path:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        return len(rows)
+
+    #store the upload (bytes or a SpooledUpload) and queue its stages, returns the job id straight away
+    def submit(self, file_bytes=None, filename="upload.pdf", stages=None, options=None, result=None, upload=None):
+        if time.time() - self._swept > SWEEP_INTERVAL_SECONDS:
+            self.sweep()
+        job_id = uuid.uuid4().hex
+        input_path = None
+        if file_bytes is not None or upload is not None:
+            extension = os.path.splitext(filename)[1].lower() or ".pdf"
+            input_path = os.path.join(self.directory, "uploads", f"{job_id}{extension}")
+            if upload is not None:
+                upload.copy_to(input_path)
+            else:
+                with open(input_path, "wb") as f:
+                    f.write(file_bytes)
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, None, 0.0, input_path, json.dumps(stages or ANALYSIS_STAGES),
+                 json.dumps(options or {}), json.dumps(result or {}), None, now, now)
+            )
+        self.pool.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for name in ("stages", "options", "result"):
+            job[name] = json.loads(job[name])
+        return job
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        if job is None or job["status"] in (DONE, FAILED):
+            return
+        result = job["result"]
+        completed = result.setdefault("completed_stages", [])
+        extractor = DataExtractor(file_path=None, file_type=None, image_path=None)
+        stage_count = len(job["stages"])
+        try:
+            for index, stage in enumerate(job["stages"]):
+                if stage in completed:
+                    continue
+                self._update(job_id, status=RUNNING, stage=stage, progress=index / stage_count)
+
+                def report(fraction, index=index):
+                    self._update(job_id, result=json.dumps(result), progress=(index + fraction) / stage_count)
+
+                STAGES[stage](job, result, extractor, report)
+                completed.append(stage)
+                # partial results are visible as soon as a stage finishes
+                self._update(job_id, result=json.dumps(result), progress=(index + 1) / len(job["stages"]))
+            self._update(job_id, status=DONE, stage=None, progress=1.0)
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=f"{type(e).__name__}: {e}", result=json.dumps(result))
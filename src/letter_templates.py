@@ -0,0 +1,200 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from fpdf import FPDF
+from PIL import Image
+
+from fast_path import DATE_PATTERN
+from metrics import span
+
+
+FONT = "Arial"
+LINE_HEIGHT = 10
+LINE_WIDTH = 200
+
+#layout of each letter: static text plus the slots filled per letter
+#("font", style, size), ("text", text, align), ("field", format, key, align, optional),
+#("paragraph", text), ("ln", height) and ("signature", width)
+LAYOUTS = {
+    "en": [
+        ("font", "", 12),
+        ("text", "", "L"),
+        ("field", "{}", "company", "L", False),
+        ("text", " ", "L"),
+        ("text", " ", "L"),
+        ("text", " ", "L"),
+        ("text", "", "L"),
+        ("field", "Contract Number: {}", "contract_number", "L", False),
+        ("field", "Date of Birth: {}", "date_of_birth", "L", True),
+        ("text", "", "L"),
+        ("font", "B", 14),
+        ("text", "Termination at the next possible date", "L"),
+        ("font", "", 12),
+        ("field", "{}", "today", "R", False),
+        ("text", "", "L"),
+        ("text", "", "L"),
+        ("paragraph", "Dear Sir or Madam,\n\n"
+                      "I hereby give notice of termination of my contract with effect from the next possible date. \n"
+                      "Please send me a written confirmation of the termination stating the date of termination.\n\n"
+                      "Never text here again.\n\n"),
+        ("font", "B", 16),
+        ("field", "{}", "quitting_party", "L", False),
+        ("font", "", 12),
+        ("field", "{}", "quitting_party", "L", False),
+        ("ln", 10),
+        ("signature", 50),
+    ],
+    "de": [
+        ("font", "", 12),
+        ("text", "", "L"),
+        ("field", "{}", "company", "L", False),
+        ("text", " ", "L"),
+        ("text", " ", "L"),
+        ("text", " ", "L"),
+        ("text", "", "L"),
+        ("field", "Vertragsnummer: {}", "contract_number", "L", False),
+        ("field", "Geburtsdatum: {}", "date_of_birth", "L", True),
+        ("text", "", "L"),
+        ("font", "B", 14),
+        ("text", "Kündigung zum nächstmöglichen Zeitpunkt", "L"),
+        ("font", "", 12),
+        ("field", "{}", "today", "R", False),
+        ("text", "", "L"),
+        ("text", "", "L"),
+        ("paragraph", "Sehr geehrte Damen und Herren,\n\n"
+                      "hiermit kündige ich meinen Vertrag fristgerecht zum nächstmöglichen Zeitpunkt. \n"
+                      "Bitte senden Sie mir eine schriftliche Bestätigung der Kündigung unter Angabe des Beendigungszeitpunktes zu.\n\n"
+                      "Mit freundlichen Grüßen\n\n"),
+        ("font", "B", 16),
+        ("field", "{}", "quitting_party", "L", False),
+        ("font", "", 12),
+        ("field", "{}", "quitting_party", "L", False),
+        ("ln", 10),
+        ("signature", 50),
+    ],
+}
+
+
+_prepared_signatures = OrderedDict()
+_prepared_lock = threading.Lock()
+_PREPARED_SIGNATURES_MAX = 256
+
+
+#opaque signatures are re-encoded once as jpeg, which fpdf embeds as is instead of
+#recompressing the raw pixels for every document; images with transparency stay png
+def prepare_signature(signature):
+    if isinstance(signature, str):
+        with open(signature, "rb") as f:
+            signature = f.read()
+    key = hashlib.sha256(signature).hexdigest()
+    with _prepared_lock:
+        if key in _prepared_signatures:
+            _prepared_signatures.move_to_end(key)
+            return _prepared_signatures[key]
+
+    image = Image.open(io.BytesIO(signature))
+    if image.format != "JPEG" and image.mode in ("RGB", "L"):
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=95)
+        prepared = output.getvalue()
+    else:
+        prepared = signature
+
+    with _prepared_lock:
+        _prepared_signatures[key] = prepared
+        if len(_prepared_signatures) > _PREPARED_SIGNATURES_MAX:
+            _prepared_signatures.popitem(last=False)
+    return prepared
+
+
+#first value of each extracted field, the date of birth only when it is a DD.MM.YYYY date
+def letter_values(data):
+    def first(key):
+        value = data.get(key)
+        return value[0] if isinstance(value, list) and value else ''
+
+    date_of_birth = first('date_of_birth')
+    return {
+        "company": first('company'),
+        "contract_number": first('contract_number'),
+        "date_of_birth": date_of_birth if DATE_PATTERN.match(date_of_birth) else None,
+        "quitting_party": first('quitting_party'),
+    }
+
+
+#a layout with its static paragraphs wrapped once, rendering only fills in the fields
+class LetterTemplate:
+    def __init__(self, layout):
+        self.ops = self._compile(layout)
+
+    def _compile(self, layout):
+        scratch = FPDF()
+        scratch.add_page()
+        ops = []
+        for op in layout:
+            if op[0] == "font":
+                scratch.set_font(FONT, style=op[1], size=op[2])
+                ops.append(op)
+            elif op[0] == "paragraph":
+                # line breaking is the costly part of the static text, do it here once
+                lines = scratch.multi_cell(LINE_WIDTH, LINE_HEIGHT, text=op[1], dry_run=True, output="LINES")
+                ops.extend(("text", line, "L") for line in lines)
+            else:
+                ops.append(op)
+        return ops
+
+    def render(self, pdf, values, signature):
+        pdf.add_page()
+        for op in self.ops:
+            kind = op[0]
+            if kind == "font":
+                pdf.set_font(FONT, style=op[1], size=op[2])
+            elif kind == "text":
+                pdf.cell(LINE_WIDTH, LINE_HEIGHT, text=op[1], align=op[2], new_x="LMARGIN", new_y="NEXT")
+            elif kind == "field":
+                value = values.get(op[2])
+                if value is None and op[4]:
+                    continue
+                pdf.cell(LINE_WIDTH, LINE_HEIGHT, text=op[1].format(value or ''), align=op[3], new_x="LMARGIN", new_y="NEXT")
+            elif kind == "ln":
+                pdf.ln(op[1])
+            elif kind == "signature" and signature:
+                pdf.image(io.BytesIO(prepare_signature(signature)), x=10, y=pdf.get_y(), w=op[1])
+
+    def render_pdf(self, data, signature, today=None):
+        with span("fpdf.render"):
+            pdf = FPDF()
+            self.render(pdf, self._values(data, today), signature)
+            return bytes(pdf.output())
+
+    #letters is a list of (data, signature) pairs; merged gives one pdf with a page per letter
+    def render_many(self, letters, merged=False):
+        today = datetime.today().strftime('%d.%m.%Y')
+        if not merged:
+            return [self.render_pdf(data, signature, today) for data, signature in letters]
+        # fonts and identical signature images are embedded once for the whole document
+        with span("fpdf.render_merged"):
+            pdf = FPDF()
+            for data, signature in letters:
+                self.render(pdf, self._values(data, today), signature)
+            return bytes(pdf.output())
+
+    def _values(self, data, today):
+        values = letter_values(data)
+        values["today"] = today or datetime.today().strftime('%d.%m.%Y')
+        return values
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+#compiled templates are kept for the life of the process
+def get_template(language="en"):
+    with _templates_lock:
+        if language not in _templates:
+            _templates[language] = LetterTemplate(LAYOUTS[language])
+        return _templates[language]
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+import config
+from disk_cache import DiskCache
+from metrics import count
+
+
+_whitespace = re.compile(r"\s+")
+
+
+#stable key for a chat request, whitespace-only differences in the prompt hit the same entry
+def fingerprint(model, messages, max_tokens, functions=None):
+    normalized = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "messages": [
+            {"role": message["role"], "content": _whitespace.sub(" ", message["content"]).strip()}
+            for message in messages
+        ],
+    }
+    if functions:
+        normalized["functions"] = functions
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+#persistent cache of chat completion texts with hit and miss counters
+class LLMResponseCache:
+    def __init__(self, directory=None, max_bytes=None, ttl=None):
+        directory = directory or os.path.join(config.CACHE_DIR, "llm")
+        max_bytes = max_bytes or config.LLM_CACHE_MAX_MB * 1024 * 1024
+        ttl = config.LLM_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.store = DiskCache(directory, max_bytes, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        content = self.store.get(key)
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        count("llm_cache.miss" if content is None else "llm_cache.hit")
+        return content
+
+    def put(self, key, content):
+        self.store.set(key, content)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    #return the completion text, use_cache=False forces a fresh completion and refreshes the entry
+    #with functions the model is made to call the first one and its json arguments are returned
+    def chat_completion(self, model, messages, max_tokens, use_cache=True, functions=None):
+        key = fingerprint(model, messages, max_tokens, functions)
+        if use_cache:
+            content = self.get(key)
+            if content is not None:
+                return content
+        from llm_gateway import get_gateway
+
+        content = get_gateway().chat_sync(model, messages, max_tokens, functions=functions)
+        self.put(key, content)
+        return content
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+#one cache per process so the counters add up across DataExtractor instances
+def get_response_cache():
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache()
+        return _shared_cache
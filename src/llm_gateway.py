@@ -0,0 +1,177 @@
+import asyncio
+import random
+import threading
+import time
+
+import aiohttp
+import openai
+from openai import error as openai_error
+
+import config
+from chunking import estimate_tokens
+from metrics import count, span
+
+
+#raised when a call fails for good, after retries or past its deadline
+class LLMGatewayError(Exception):
+    pass
+
+
+#errors worth another attempt: rate limits, 5xx responses, timeouts and dropped connections
+def is_retryable(exc):
+    if isinstance(exc, (openai_error.RateLimitError, openai_error.ServiceUnavailableError,
+                        openai_error.Timeout, openai_error.APIConnectionError, openai_error.TryAgain,
+                        aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(exc, openai_error.APIError):
+        return exc.http_status is None or exc.http_status >= 500
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429 or exc.status >= 500
+    return False
+
+
+def _retry_after(exc):
+    headers = getattr(exc, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+#token bucket refilled at rate tokens per second, callers wait for a token instead of tripping the api limit
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+#asyncio front door to openai with one shared http session, a cap on requests in flight,
+#a request rate limit, exponential backoff and a deadline per call
+class LLMGateway:
+    def __init__(self, max_in_flight=None, requests_per_minute=None, max_retries=None, timeout=None):
+        self.max_in_flight = max_in_flight or config.LLM_MAX_IN_FLIGHT
+        self.requests_per_minute = requests_per_minute or config.LLM_REQUESTS_PER_MINUTE
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or config.LLM_TIMEOUT_SECONDS
+        self.loop = None
+        self.session = None
+        self._semaphore = None
+        self._bucket = None
+        self._started = threading.Lock()
+
+    #the gateway owns an event loop in a daemon thread so blocking callers can share it
+    def _ensure_loop(self):
+        with self._started:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self.loop = loop
+
+    async def _setup(self):
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        per_second = self.requests_per_minute / 60
+        self._bucket = TokenBucket(per_second, max(1, self.max_in_flight))
+
+    async def _call(self, make_request, timeout):
+        # reuse the pooled session for the openai client inside this task
+        openai.aiosession.set(self.session)
+        deadline = time.monotonic() + (timeout or self.timeout)
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMGatewayError("deadline exceeded")
+            await self._bucket.acquire()
+            try:
+                async with self._semaphore:
+                    return await asyncio.wait_for(make_request(remaining), timeout=remaining)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise LLMGatewayError(f"{type(e).__name__}: {e}") from e
+                delay = _retry_after(e) or min(30, 2 ** attempt) * (0.5 + random.random())
+                if time.monotonic() + delay >= deadline:
+                    raise LLMGatewayError(f"deadline exceeded after {attempt + 1} attempts: {type(e).__name__}: {e}") from e
+                attempt += 1
+                count("openai.retries")
+                await asyncio.sleep(delay)
+
+    #with functions the first one is forced and its arguments (a json string) are returned instead of the text
+    async def chat(self, model, messages, max_tokens, timeout=None, functions=None):
+        options = {"functions": functions, "function_call": {"name": functions[0]["name"]}} if functions else {}
+
+        async def make_request(remaining):
+            response = await openai.ChatCompletion.acreate(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                request_timeout=remaining,
+                **options
+            )
+            message = response.choices[0].message
+            if functions:
+                return message.get("function_call", {}).get("arguments", "").strip()
+            return message["content"].strip()
+        with span("openai.chat"):
+            content = await self._call(make_request, timeout)
+        count("llm.prompt_tokens", sum(estimate_tokens(message["content"]) for message in messages))
+        count("llm.completion_tokens", estimate_tokens(content))
+        return content
+
+    async def image(self, prompt, size, timeout=None):
+        async def make_request(remaining):
+            response = await openai.Image.acreate(prompt=prompt, n=1, size=size, request_timeout=remaining)
+            return response['data'][0]['url']
+        with span("openai.image"):
+            return await self._call(make_request, timeout)
+
+    async def download(self, url, timeout=None):
+        async def make_request(remaining):
+            async with self.session.get(url, raise_for_status=True) as response:
+                return await response.read()
+        with span("openai.download"):
+            return await self._call(make_request, timeout)
+
+    #run a gateway coroutine from blocking code
+    def run(self, coro):
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def chat_sync(self, model, messages, max_tokens, timeout=None, functions=None):
+        return self.run(self.chat(model, messages, max_tokens, timeout, functions))
+
+    def image_sync(self, prompt, size, timeout=None):
+        return self.run(self.image(prompt, size, timeout))
+
+    def download_sync(self, url, timeout=None):
+        return self.run(self.download(url, timeout))
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+#one gateway per process, its limits apply to every session
+def get_gateway():
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
@@ -0,0 +1,149 @@
+import functools
+import json
+import threading
+import time
+from contextlib import nullcontext
+
+import config
+
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+_enabled = config.METRICS_ENABLED
+_noop = nullcontext()
+
+
+def enable(value=True):
+    global _enabled
+    _enabled = value
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+
+
+def count(name, value=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+#record a duration that was measured elsewhere, e.g. in a worker process
+def observe(name, seconds):
+    if not _enabled:
+        return
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            _timings[name] = {"count": 1, "sum": seconds, "max": seconds, "errors": 0}
+        else:
+            timing["count"] += 1
+            timing["sum"] += seconds
+            if seconds > timing["max"]:
+                timing["max"] = seconds
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start)
+        if exc_type is not None:
+            with _lock:
+                _timings[self.name]["errors"] += 1
+        return False
+
+
+#time a block: with span("llm.analyze"): ...
+def span(name):
+    if not _enabled:
+        return _noop
+    return _Span(name)
+
+
+#time every call of the decorated function
+def traced(name):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def export_json():
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "timings": {name: dict(timing) for name, timing in _timings.items()},
+        }
+
+
+def _metric_name(name):
+    return "contract_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def export_prometheus():
+    snapshot = export_json()
+    lines = []
+    for name, value in sorted(snapshot["counters"].items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, timing in sorted(snapshot["timings"].items()):
+        metric = _metric_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_count {timing['count']}")
+        lines.append(f"{metric}_sum {timing['sum']:.6f}")
+        lines.append(f"# TYPE {metric}_max gauge")
+        lines.append(f"{metric}_max {timing['max']:.6f}")
+        lines.append(f"# TYPE {_metric_name(name)}_errors_total counter")
+        lines.append(f"{_metric_name(name)}_errors_total {timing['errors']}")
+    return "\n".join(lines) + "\n"
+
+
+#serve /metrics (prometheus text) and /metrics.json from a daemon thread
+def start_http_exporter(port, host="127.0.0.1"):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = export_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body = json.dumps(export_json()).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
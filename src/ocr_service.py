@@ -0,0 +1,227 @@
+import io
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import partial
+
+from PIL import Image, ImageOps
+
+import config
+
+
+#throughput versus accuracy presets: resolution tesseract sees, whether to deskew and binarize, and its page mode
+PROFILES = {
+    "fast": {"target_dpi": 200, "deskew": False, "binarize": True, "tesseract_config": "--oem 1 --psm 6"},
+    "balanced": {"target_dpi": 300, "deskew": True, "binarize": True, "tesseract_config": "--oem 1 --psm 3"},
+    "accurate": {"target_dpi": 400, "deskew": True, "binarize": False, "tesseract_config": "--oem 1 --psm 3"},
+}
+
+#long edge of an A4 page in inches, used to size photos that carry no usable dpi
+_A4_LONG_EDGE_INCHES = 11.69
+
+
+@dataclass
+class OCRResult:
+    text: str
+    timings: dict = field(default_factory=dict)
+    error: str = None
+    # share of the page pixels tesseract was given
+    coverage: float = 1.0
+
+
+def load_image(source):
+    if isinstance(source, (bytes, bytearray)):
+        return Image.open(io.BytesIO(source))
+    return Image.open(source)
+
+
+#scale so that the page is rendered at roughly target_dpi, never upscale
+def downscale(image, target_dpi):
+    max_edge = int(_A4_LONG_EDGE_INCHES * target_dpi)
+    long_edge = max(image.size)
+    if long_edge <= max_edge:
+        return image
+    ratio = max_edge / long_edge
+    return image.resize((max(1, int(image.width * ratio)), max(1, int(image.height * ratio))), Image.LANCZOS)
+
+
+#otsu threshold from the grayscale histogram
+def otsu_threshold(image):
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0
+    weight_background = 0
+    best_threshold = 127
+    best_variance = 0
+    for threshold, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += threshold * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance = variance
+            best_threshold = threshold
+    return best_threshold
+
+
+def binarize(image):
+    threshold = otsu_threshold(image)
+    return image.point(lambda value: 255 if value > threshold else 0, mode="L")
+
+
+#pick the rotation whose row profile is sharpest, text lines then run horizontally
+def estimate_skew(image, max_angle=5.0, step=0.5):
+    small = image.copy()
+    small.thumbnail((800, 800))
+    small = ImageOps.invert(binarize(small))
+    best_angle = 0.0
+    best_score = -1.0
+    angle = -max_angle
+    while angle <= max_angle + 1e-9:
+        rotated = small.rotate(angle, resample=Image.NEAREST, expand=False)
+        # averaging every row down to one pixel gives the horizontal projection profile
+        rows = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        mean = sum(rows) / len(rows)
+        score = sum((value - mean) ** 2 for value in rows)
+        if score > best_score:
+            best_score = score
+            best_angle = angle
+        angle += step
+    return best_angle
+
+
+def deskew(image):
+    angle = estimate_skew(image)
+    if angle == 0:
+        return image
+    return image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+
+#grayscale, downscale, deskew and binarize an image, timing every stage
+def preprocess(image, profile, timings):
+    start = time.perf_counter()
+    image = ImageOps.exif_transpose(image).convert("L")
+    timings["grayscale"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    image = downscale(image, profile["target_dpi"])
+    timings["downscale"] = time.perf_counter() - start
+
+    if profile["deskew"]:
+        start = time.perf_counter()
+        image = deskew(image)
+        timings["deskew"] = time.perf_counter() - start
+
+    if profile["binarize"]:
+        start = time.perf_counter()
+        image = binarize(image)
+        timings["binarize"] = time.perf_counter() - start
+    return image
+
+
+#decode and preprocess an image for tesseract
+def load_page(source, profile, timings):
+    start = time.perf_counter()
+    image = load_image(source)
+    # jpeg photos can be decoded at a reduced size straight away
+    image.draft("L", (int(_A4_LONG_EDGE_INCHES * profile["target_dpi"]),) * 2)
+    image.load()
+    timings["load"] = time.perf_counter() - start
+    return preprocess(image, profile, timings)
+
+
+#runs in a worker process, the image is decoded there rather than pickled across
+def ocr_source(source, profile, lang, timeout):
+    from tesseract_engine import image_to_string
+
+    timings = {}
+    try:
+        image = load_page(source, profile, timings)
+
+        start = time.perf_counter()
+        text = image_to_string(image, lang=lang, config=profile["tesseract_config"], timeout=timeout)
+        timings["ocr"] = time.perf_counter() - start
+        return OCRResult(text, timings)
+    except Exception as e:
+        return OCRResult("", timings, f"{type(e).__name__}: {e}")
+
+
+#pool of tesseract worker processes fed with normalized images, each worker keeps its engines loaded (see tesseract_engine)
+class OCRService:
+    def __init__(self, workers=None, profile=None, lang=None, timeout=None):
+        self.workers = workers or config.OCR_WORKERS
+        self.profile = PROFILES[profile or config.OCR_PROFILE]
+        self.lang = lang or config.OCR_LANG
+        self.timeout = timeout or config.OCR_TIMEOUT_SECONDS
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    #a worker that died takes the whole pool with it, the next call starts a fresh one
+    def _drop_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    #regions=True reads only the header text blocks, see region_ocr
+    def ocr_images(self, sources, regions=False):
+        pool = self._get_pool()
+        if regions:
+            from region_ocr import ocr_regions
+
+            read = partial(ocr_regions, top_fraction=config.OCR_REGION_TOP_FRACTION)
+        else:
+            read = ocr_source
+        try:
+            futures = [pool.submit(read, source, self.profile, self.lang, self.timeout) for source in sources]
+        except BrokenProcessPool:
+            # broken by an earlier call, retried once on a fresh pool
+            self._drop_pool(pool)
+            pool = self._get_pool()
+            futures = [pool.submit(read, source, self.profile, self.lang, self.timeout) for source in sources]
+        results = []
+        for future in futures:
+            try:
+                # tesseract is killed at the timeout, the margin covers queueing and preprocessing
+                results.append(future.result(timeout=self.timeout * 2))
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._drop_pool(pool)
+                results.append(OCRResult("", {}, f"{type(e).__name__}: {e}"))
+        return results
+
+    def ocr_image(self, source, regions=False):
+        return self.ocr_images([source], regions)[0]
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_ocr_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = OCRService()
+        return _service
@@ -0,0 +1,88 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+import config
+from chunking import chunk_text, estimate_tokens
+
+
+#what each analysis looks for, as bm25 queries in english and german; short stems also match longer words
+QUESTIONS = {
+    "parties": "contract party parties policyholder insured customer insurer company name vertragspartner "
+               "versicherungsnehmer versicherer kunde",
+    "identifiers": "contract number policy date birth vertragsnummer versicherungsnummer geburtsdatum geboren",
+    "termination": "terminate termination cancel cancellation notice period end kündig frist beendig ablauf laufzeit widerruf",
+    "risks": "liability penalty fee exclusion obligation damages haftung gebühr vertragsstrafe ausschluss pflicht schaden",
+}
+
+_term = re.compile(r"\w+")
+#query terms at least this long also match index terms they are a prefix of, "kündig" finds "kündigungsfrist"
+_PREFIX_MIN_CHARS = 5
+
+
+def _terms(text):
+    return [term for term in _term.findall(text.lower()) if len(term) > 1]
+
+
+#bm25 index over the passages of one contract
+class PassageIndex:
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self._counts = [Counter(_terms(passage)) for passage in passages]
+        self._lengths = [sum(counts.values()) for counts in self._counts]
+        self._average_length = sum(self._lengths) / len(passages) if passages else 1
+        frequencies = Counter(term for counts in self._counts for term in counts)
+        self._idf = {
+            term: math.log(1 + (len(passages) - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in frequencies.items()
+        }
+
+    #index terms a query term stands for
+    def _expand(self, term):
+        if len(term) < _PREFIX_MIN_CHARS:
+            return [term] if term in self._idf else []
+        return [candidate for candidate in self._idf if candidate.startswith(term)]
+
+    def scores(self, query):
+        terms = [expanded for term in set(_terms(query)) for expanded in self._expand(term)]
+        scores = []
+        for counts, length in zip(self._counts, self._lengths):
+            score = 0.0
+            for term in terms:
+                frequency = counts.get(term, 0)
+                if frequency:
+                    norm = self.k1 * (1 - self.b + self.b * length / self._average_length)
+                    score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append(score)
+        return scores
+
+    #indexes of the k best passages for the query, best first; passages without any query term are left out
+    def search(self, query, k):
+        scores = self.scores(query)
+        ranked = sorted(range(len(scores)), key=lambda index: scores[index], reverse=True)
+        return [index for index in ranked[:k] if scores[index] > 0]
+
+    #the top k passages of every question, joined in document order
+    def select(self, questions, k):
+        indexes = sorted({index for question in questions for index in self.search(question, k)})
+        # the first passage holds the letterhead and reference block, it always goes along
+        if self.passages and 0 not in indexes:
+            indexes.insert(0, 0)
+        return "\n\n".join(self.passages[index] for index in indexes)
+
+
+#one index per contract text, repeated questions about the same text reuse it
+@lru_cache(maxsize=8)
+def get_passage_index(text):
+    return PassageIndex(chunk_text(text, config.PASSAGE_TOKENS))
+
+
+#the passages of text relevant to the named QUESTIONS, the whole text when it already fits the budget
+def select_passages(text, questions, k=None, min_tokens=None):
+    min_tokens = config.LLM_CHUNK_TOKENS if min_tokens is None else min_tokens
+    if estimate_tokens(text) <= min_tokens:
+        return text
+    return get_passage_index(text).select([QUESTIONS[name] for name in questions], k or config.PASSAGE_TOP_K)
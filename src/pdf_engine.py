@@ -0,0 +1,161 @@
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import config
+from chunking import PAGE_SEPARATOR
+
+
+#bump whenever extraction output changes so cached results are not reused
+EXTRACTOR_VERSION = "2"
+
+
+#pdf opened once per worker process by the pool initializer
+_worker_pdf = None
+_worker_source = None
+
+
+def _open_source(source):
+    import pdfplumber
+
+    if isinstance(source, (bytes, bytearray)):
+        return pdfplumber.open(io.BytesIO(source))
+    return pdfplumber.open(source)
+
+
+def _init_worker(source):
+    global _worker_pdf, _worker_source
+    _worker_source = source
+    _worker_pdf = _open_source(source)
+
+
+def _extract_range(engine, page_range):
+    start, stop = page_range
+    return [engine.process_page(_worker_pdf.pages[i], _worker_source) for i in range(start, stop)]
+
+
+#turn a path, uploaded file or raw bytes into something every worker can reopen
+def load_source(file):
+    if isinstance(file, (str, os.PathLike, bytes, bytearray)):
+        return file
+    if hasattr(file, "seek"):
+        file.seek(0)
+    data = file.read()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return data
+
+
+def split_pages(page_count, chunk_pages, first_page=0):
+    chunk_pages = max(1, chunk_pages)
+    return [(start, min(start + chunk_pages, page_count)) for start in range(first_page, page_count, chunk_pages)]
+
+
+#rasterize a single page, never the whole document
+def rasterize_page(source, page_number, dpi):
+    from pdf2image import convert_from_bytes, convert_from_path
+
+    if isinstance(source, (bytes, bytearray)):
+        images = convert_from_bytes(source, dpi=dpi, first_page=page_number, last_page=page_number)
+    else:
+        images = convert_from_path(source, dpi=dpi, first_page=page_number, last_page=page_number)
+    return images[0]
+
+
+#result of extracting one page, method is "text" or "ocr"
+@dataclass
+class PageResult:
+    page_number: int
+    text: str
+    method: str
+    seconds: float
+    chars: int
+    density: float
+
+
+#extraction engine that spreads page ranges of one pdf across a process pool
+class PDFExtractionEngine:
+    def __init__(self, workers=None, chunk_pages=None, min_parallel_pages=None, ocr_fallback=None, dpi=None):
+        self.workers = workers or config.PDF_WORKERS
+        self.chunk_pages = chunk_pages or config.PDF_CHUNK_PAGES
+        self.min_parallel_pages = config.PDF_PARALLEL_MIN_PAGES if min_parallel_pages is None else min_parallel_pages
+        self.ocr_fallback = config.OCR_FALLBACK if ocr_fallback is None else ocr_fallback
+        self.dpi = dpi or config.OCR_DPI
+        self.lang = config.OCR_LANG
+        self.window_pages = config.PDF_STREAM_WINDOW_PAGES
+        self.min_chars = config.TEXT_LAYER_MIN_CHARS
+        self.min_density = config.TEXT_LAYER_MIN_DENSITY
+
+    #score the text layer: printable characters and glyphs per square inch
+    def score_text_layer(self, page, text):
+        chars = sum(1 for c in text if not c.isspace())
+        area = (float(page.width) / 72) * (float(page.height) / 72)
+        density = len(page.chars) / area if area else 0.0
+        return chars, density
+
+    def has_text_layer(self, chars, density):
+        return chars >= self.min_chars and density >= self.min_density
+
+    def process_page(self, page, source):
+        start = time.perf_counter()
+        # pages without a text layer return None
+        text = page.extract_text() or ""
+        chars, density = self.score_text_layer(page, text)
+        method = "text"
+        if self.ocr_fallback and not self.has_text_layer(chars, density):
+            from tesseract_engine import image_to_string
+
+            image = rasterize_page(source, page.page_number, self.dpi)
+            text = image_to_string(image, lang=self.lang)
+            method = "ocr"
+        page.close()
+        return PageResult(page.page_number, text, method, time.perf_counter() - start, chars, density)
+
+    def page_count(self, file):
+        with _open_source(load_source(file)) as pdf:
+            return len(pdf.pages)
+
+    #(worker processes, chunks in flight) for reading pages in parallel; the chunks in flight hold
+    #at most window_pages pages (one chunk when a chunk alone is larger), idle workers are not started
+    def pool_size(self, pages):
+        in_flight = max(1, min(self.window_pages // self.chunk_pages, -(-pages // self.chunk_pages)))
+        return min(self.workers, in_flight), in_flight
+
+    #yield pages in order as they are extracted, at most window_pages are parsed ahead of the consumer
+    #first_page (0-based) resumes a document whose leading pages were read before
+    #parallel=False reads one page at a time in this process, for consumers that may stop after any page
+    def iter_pages(self, file, first_page=0, parallel=True):
+        source = load_source(file)
+        with _open_source(source) as pdf:
+            page_count = len(pdf.pages)
+            if not parallel or self.workers <= 1 or page_count - first_page < self.min_parallel_pages:
+                for page in pdf.pages[first_page:]:
+                    yield self.process_page(page, source)
+                return
+
+        ranges = iter(split_pages(page_count, self.chunk_pages, first_page))
+        workers, in_flight = self.pool_size(page_count - first_page)
+        extract_range = partial(_extract_range, self)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(source,))
+        try:
+            pending = deque(pool.submit(extract_range, page_range) for _, page_range in zip(range(in_flight), ranges))
+            while pending:
+                chunk = pending.popleft().result()
+                page_range = next(ranges, None)
+                if page_range is not None:
+                    pending.append(pool.submit(extract_range, page_range))
+                yield from chunk
+        finally:
+            # a consumer that stops early does not wait for pages it will never read,
+            # chunks already running finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def extract_pages(self, file):
+        return list(self.iter_pages(file))
+
+    def extract_text(self, file):
+        return PAGE_SEPARATOR.join(result.text for result in self.extract_pages(file))
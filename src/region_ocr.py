@@ -0,0 +1,129 @@
+import time
+
+from PIL import Image, ImageOps
+
+from fast_path import FIELD_LABELS
+from ocr_service import OCRResult, binarize, load_page
+from tesseract_engine import image_to_data, image_to_string
+
+
+#tesseract settings for the text blocks, every block is read as one uniform block of text
+BLOCK_CONFIG = "--oem 1 --psm 6"
+
+#the value after a label is read again as a single line restricted to the characters the field can contain
+FIELD_CONFIGS = {
+    "contract_number": "--oem 1 --psm 7 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-/.",
+    "date_of_birth": "--oem 1 --psm 7 -c tessedit_char_whitelist=0123456789.",
+}
+
+#mean ink (0-255) a row or column needs to count as text
+_INK_THRESHOLD = 2
+
+
+#runs of profile entries above the threshold as (start, end), gaps up to max_gap are bridged
+def _runs(profile, max_gap):
+    runs = []
+    start = last = None
+    for index, value in enumerate(profile):
+        if value <= _INK_THRESHOLD:
+            continue
+        if start is None:
+            start = index
+        elif index - last > max_gap:
+            runs.append((start, last + 1))
+            start = index
+        last = index
+    if start is not None:
+        runs.append((start, last + 1))
+    return runs
+
+
+#text blocks in the top of the page from row and column ink projections, as (left, top, right, bottom)
+#lines closer than about a blank line form one block, a wide horizontal gap splits letterhead and reference block
+def find_regions(image, top_fraction, padding=4):
+    height = max(1, int(image.height * top_fraction))
+    ink = ImageOps.invert(binarize(image.crop((0, 0, image.width, height))))
+    rows = list(ink.resize((1, height), Image.BOX).getdata())
+    regions = []
+    for top, bottom in _runs(rows, max(2, image.height // 100)):
+        band = ink.crop((0, top, image.width, bottom))
+        columns = list(band.resize((image.width, 1), Image.BOX).getdata())
+        for left, right in _runs(columns, max(2, image.width // 20)):
+            regions.append((
+                max(0, left - padding), max(0, top - padding),
+                min(image.width, right + padding), min(height, bottom + padding)
+            ))
+    return regions
+
+
+#words of an image_to_data result grouped into lines, each word as (text, left, top, width, height)
+def _lines(data):
+    lines = {}
+    for index, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        key = (data["block_num"][index], data["par_num"][index], data["line_num"][index])
+        lines.setdefault(key, []).append(
+            (word, data["left"][index], data["top"][index], data["width"][index], data["height"][index])
+        )
+    return list(lines.values())
+
+
+#number of words the label covers in the space-joined line, the value starts with the next word
+def _label_words(words, line, match):
+    end = len(line[:match.end()].rstrip())
+    position = 0
+    for index, word in enumerate(words):
+        position += len(word[0]) + 1
+        if position > end:
+            return index + 1
+    return len(words)
+
+
+#read the value right of a field label again with the field's tesseract settings, None when the line has no value
+def _read_value(crop, words, field, lang, timeout):
+    line = " ".join(word[0] for word in words)
+    label_words = _label_words(words, line, FIELD_LABELS[field].search(line))
+    value_words = words[label_words:]
+    if not value_words:
+        return None
+    left = min(word[1] for word in value_words)
+    top = min(word[2] for word in value_words)
+    right = max(word[1] + word[3] for word in value_words)
+    bottom = max(word[2] + word[4] for word in value_words)
+    box = (max(0, left - 4), max(0, top - 4), min(crop.width, right + 4), min(crop.height, bottom + 4))
+    value = image_to_string(crop.crop(box), lang=lang, config=FIELD_CONFIGS[field], timeout=timeout).strip()
+    if not value:
+        return None
+    return " ".join(word[0] for word in words[:label_words]) + " " + value
+
+
+#runs in a worker process like ocr_source, but only the header text blocks are read
+#lines that carry a field label get their value read again with the field's settings
+def ocr_regions(source, profile, lang, timeout, top_fraction):
+    timings = {}
+    try:
+        image = load_page(source, profile, timings)
+
+        start = time.perf_counter()
+        regions = find_regions(image, top_fraction)
+        timings["layout"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lines = []
+        for region in regions:
+            crop = image.crop(region)
+            data = image_to_data(crop, lang=lang, config=BLOCK_CONFIG, timeout=timeout)
+            for words in _lines(data):
+                line = " ".join(word[0] for word in words)
+                for field in FIELD_CONFIGS:
+                    if FIELD_LABELS[field].search(line):
+                        line = _read_value(crop, words, field, lang, timeout) or line
+                        break
+                lines.append(line)
+        timings["ocr"] = time.perf_counter() - start
+
+        area = sum((right - left) * (bottom - top) for left, top, right, bottom in regions)
+        return OCRResult("\n".join(lines), timings, coverage=area / (image.width * image.height))
+    except Exception as e:
+        return OCRResult("", timings, f"{type(e).__name__}: {e}")
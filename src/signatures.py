@@ -0,0 +1,142 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+import unicodedata
+import zlib
+
+from PIL import Image, ImageDraw, ImageFont
+
+import config
+from disk_cache import DiskCache
+from llm_gateway import get_gateway
+from metrics import count, span
+
+
+def normalize_name(name):
+    return " ".join(unicodedata.normalize("NFKC", name).split())
+
+
+#draws the name with a script font, or a slanted default font when no script font is installed;
+#no script font ships with the repo, put .ttf/.otf files into SIGNATURE_FONT_DIR to get handwriting
+class LocalSignatureBackend:
+    name = "local"
+
+    def __init__(self, font_dir=None, size=64):
+        self.font_dir = font_dir or config.SIGNATURE_FONT_DIR
+        self.size = size
+        self._fonts = None
+
+    def _font_paths(self):
+        if self._fonts is None:
+            fonts = []
+            if os.path.isdir(self.font_dir):
+                fonts = sorted(
+                    os.path.join(self.font_dir, name) for name in os.listdir(self.font_dir)
+                    if name.lower().endswith((".ttf", ".otf"))
+                )
+            self._fonts = fonts
+        return self._fonts
+
+    def render(self, name, style):
+        fonts = self._font_paths()
+        if fonts:
+            # the same name always gets the same font
+            index = zlib.crc32(f"{name}|{style}".encode("utf-8")) % len(fonts)
+            font = ImageFont.truetype(fonts[index], self.size)
+            slant = 0.0
+        else:
+            font = ImageFont.load_default(self.size)
+            slant = 0.3
+
+        left, top, right, bottom = font.getbbox(name)
+        width = right - left + self.size
+        height = bottom - top + self.size // 2
+        image = Image.new("L", (width, height), 255)
+        ImageDraw.Draw(image).text((self.size // 2 - left, self.size // 4 - top), name, font=font, fill=20)
+        if slant:
+            # shear to the right so block letters read as handwriting
+            width += int(height * slant)
+            image = image.transform((width, height), Image.AFFINE, (1, slant, -height * slant, 0, 1, 0),
+                                    resample=Image.BICUBIC, fillcolor=255)
+        image = image.crop(Image.eval(image, lambda value: 255 - value).getbbox() or (0, 0, width, height))
+
+        output = io.BytesIO()
+        image.save(output, format="PNG", optimize=False)
+        return output.getvalue()
+
+
+#dall-e image generation through the shared gateway, the png is returned as downloaded
+class DalleSignatureBackend:
+    name = "dalle"
+
+    def render(self, name, style):
+        prompt = (
+            f"Generate a realistic handwritten signature for the name '{name}'. "
+            f"The signature should be elegant, clear, and written in a {style} style. "
+            "The background should be transparent, and the signature should be centered "
+            "with no additional text or decorations. Ensure that the handwriting appears "
+            "natural and fluid, resembling an authentic signature."
+        )
+        gateway = get_gateway()
+        image_url = gateway.image_sync(prompt, "256x256")
+        return gateway.download_sync(image_url)
+
+
+#signature png bytes by name, served from the cache or the fastest backend that fits the latency budget
+class SignatureProvider:
+    def __init__(self, cache_dir=None, max_bytes=None):
+        cache_dir = cache_dir or os.path.join(config.CACHE_DIR, "signatures")
+        max_bytes = max_bytes or config.SIGNATURE_CACHE_MAX_MB * 1024 * 1024
+        self.cache = DiskCache(cache_dir, max_bytes)
+        self.local = LocalSignatureBackend()
+        self.remote = DalleSignatureBackend()
+
+    #the name is drawn as written, "max mustermann" and "Max Mustermann" are different signatures
+    def _key(self, name, style, backend):
+        return hashlib.sha256(f"{backend.name}|{style}|{normalize_name(name)}".encode("utf-8")).hexdigest()
+
+    #latency_budget in seconds, None means any backend is fine
+    def choose_backend(self, latency_budget):
+        if latency_budget is not None and latency_budget < config.SIGNATURE_REMOTE_LATENCY_SECONDS:
+            return self.local
+        if not os.getenv("OPENAI_API_KEY"):
+            return self.local
+        return self.remote
+
+    def get(self, name, style="cursive", latency_budget=None):
+        name = normalize_name(name)
+        backend = self.choose_backend(latency_budget)
+        key = self._key(name, style, backend)
+        cached = self.cache.get(key)
+        if cached is not None:
+            count("signature_cache.hit")
+            return base64.b64decode(cached)
+        count("signature_cache.miss")
+
+        try:
+            with span(f"signature.{backend.name}"):
+                signature = backend.render(name, style)
+        except Exception as e:
+            if backend is self.local:
+                raise
+            print(f"Error generating signature remotely, drawing it locally: {e}")
+            backend = self.local
+            key = self._key(name, style, backend)
+            with span(f"signature.{backend.name}"):
+                signature = backend.render(name, style)
+        self.cache.set(key, base64.b64encode(signature).decode("ascii"))
+        return signature
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_signature_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = SignatureProvider()
+        return _provider
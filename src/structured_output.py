@@ -0,0 +1,63 @@
+import json
+from dataclasses import dataclass, fields
+from typing import Optional
+
+
+#name of the function the model is made to call with the fields it found
+FUNCTION_NAME = "record_contract_fields"
+
+#answers that mean "not found" even though the model put a string there
+_EMPTY_VALUES = {"", "null", "none", "n/a", "unknown", "not found", "not stated"}
+
+
+#typed result of a structured extraction, None marks a field that was not found
+@dataclass
+class ContractInfo:
+    company: Optional[str] = None
+    contract_number: Optional[str] = None
+    date_of_birth: Optional[str] = None
+    quitting_party: Optional[str] = None
+
+    def missing(self):
+        return [field.name for field in fields(self) if getattr(self, field.name) is None]
+
+    #set the fields that are still empty, values for filled fields are ignored
+    def fill(self, values):
+        for key, value in values.items():
+            if getattr(self, key, "") is None and value:
+                setattr(self, key, value)
+
+    #the {"field": [values]} dict the rest of the pipeline works with
+    def to_extracted_info(self):
+        return {field.name: [getattr(self, field.name)] if getattr(self, field.name) else [] for field in fields(self)}
+
+
+#function schema for the requested fields, descriptions maps each field to how it is described to the model
+def contract_function(descriptions):
+    return {
+        "name": FUNCTION_NAME,
+        "description": "Record the fields stated in the contract text, null for a field the text does not state.",
+        "parameters": {
+            "type": "object",
+            "properties": {key: {"type": ["string", "null"], "description": description} for key, description in descriptions.items()},
+            "required": list(descriptions),
+        },
+    }
+
+
+#validate the function arguments into {field: value} for the requested fields, None when they are not a json object
+def parse_arguments(arguments, requested):
+    try:
+        payload = json.loads(arguments)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    values = {}
+    for key in requested:
+        value = payload.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if isinstance(value, str) and value.strip().lower() not in _EMPTY_VALUES:
+            values[key] = value.strip()
+    return values
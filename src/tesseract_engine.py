@@ -0,0 +1,146 @@
+import queue
+import shlex
+import threading
+from contextlib import contextmanager
+
+import config
+
+
+#idle tesserocr engines per (language, config), shared by every thread of the process;
+#streamlit runs each rerun in a new thread, so engines kept per thread would be loaded again on every interaction
+_idle = {}
+#engines created per (language, config), at most OCR_ENGINES
+_created = {}
+_pool_lock = threading.Lock()
+#the tesserocr module once imported, False when it is not installed
+_tesserocr = None
+
+
+def _load_tesserocr():
+    global _tesserocr
+    if _tesserocr is None:
+        try:
+            import tesserocr
+            _tesserocr = tesserocr
+        except ImportError:
+            _tesserocr = False
+    return _tesserocr
+
+
+#the tesserocr module when engines are kept loaded, False when every call runs the tesseract cli through pytesseract
+def _persistent_backend():
+    if config.OCR_BACKEND != "tesserocr":
+        return False
+    return _load_tesserocr()
+
+
+#"--oem 1 --psm 6 -c name=value" as (oem, psm, {name: value})
+def parse_config(tesseract_config):
+    oem = psm = None
+    variables = {}
+    options = shlex.split(tesseract_config or "")
+    for index, option in enumerate(options[:-1]):
+        if option == "--oem":
+            oem = int(options[index + 1])
+        elif option == "--psm":
+            psm = int(options[index + 1])
+        elif option == "-c" and "=" in options[index + 1]:
+            name, value = options[index + 1].split("=", 1)
+            variables[name] = value
+    return oem, psm, variables
+
+
+def _new_engine(tesserocr, lang, tesseract_config):
+    oem, psm, variables = parse_config(tesseract_config)
+    options = {"lang": lang}
+    # tesserocr's OEM and PSM constants are plain ints
+    if oem is not None:
+        options["oem"] = oem
+    if psm is not None:
+        options["psm"] = psm
+    if config.TESSDATA_DIR:
+        options["path"] = config.TESSDATA_DIR
+    engine = tesserocr.PyTessBaseAPI(**options)
+    for name, value in variables.items():
+        engine.SetVariable(name, value)
+    return engine
+
+
+#check out a loaded engine for lang and config: an idle one, a new one while fewer than OCR_ENGINES exist,
+#otherwise wait for one to be returned; it is cleared and returned after the call
+@contextmanager
+def _engine(tesserocr, lang, tesseract_config):
+    key = (lang, tesseract_config)
+    with _pool_lock:
+        idle = _idle.setdefault(key, queue.Queue())
+        create = idle.empty() and _created.get(key, 0) < max(1, config.OCR_ENGINES)
+        if create:
+            _created[key] = _created.get(key, 0) + 1
+    if create:
+        try:
+            engine = _new_engine(tesserocr, lang, tesseract_config)
+        except Exception:
+            with _pool_lock:
+                _created[key] -= 1
+            raise
+    else:
+        engine = idle.get()
+    try:
+        yield engine
+    finally:
+        engine.Clear()
+        idle.put(engine)
+
+
+def _recognize(engine, image, timeout):
+    engine.SetImage(image)
+    # tesserocr takes the timeout in milliseconds, 0 waits as long as it takes
+    if not engine.Recognize(timeout=int(timeout * 1000)):
+        raise RuntimeError("Tesseract process timeout")
+
+
+#drop-in for pytesseract.image_to_string, the image is handed over in memory to an engine that stays loaded
+def image_to_string(image, lang="eng", config="", timeout=0):
+    tesserocr = _persistent_backend()
+    if not tesserocr:
+        import pytesseract
+
+        return pytesseract.image_to_string(image, lang=lang, config=config, timeout=timeout)
+    with _engine(tesserocr, lang, config) as engine:
+        _recognize(engine, image, timeout)
+        return engine.GetUTF8Text()
+
+
+#drop-in for pytesseract.image_to_data with output_type=Output.DICT, only the keys region_ocr reads
+def image_to_data(image, lang="eng", config="", timeout=0):
+    tesserocr = _persistent_backend()
+    if not tesserocr:
+        import pytesseract
+
+        return pytesseract.image_to_data(image, lang=lang, config=config, timeout=timeout, output_type=pytesseract.Output.DICT)
+    data = {"text": [], "block_num": [], "par_num": [], "line_num": [], "left": [], "top": [], "width": [], "height": []}
+    with _engine(tesserocr, lang, config) as engine:
+        _recognize(engine, image, timeout)
+        level = tesserocr.RIL.WORD
+        block = par = line = 0
+        for word in tesserocr.iterate_level(engine.GetIterator(), level):
+            if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block, par, line = block + 1, 0, 0
+            if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+                par, line = par + 1, 0
+            if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                line += 1
+            box = word.BoundingBox(level)
+            if box is None:
+                continue
+            left, top, right, bottom = box
+            for key, value in (("text", word.GetUTF8Text(level) or ""), ("block_num", block), ("par_num", par),
+                               ("line_num", line), ("left", left), ("top", top),
+                               ("width", right - left), ("height", bottom - top)):
+                data[key].append(value)
+        return data
+
+
+#name of the backend that actually serves calls in this process
+def active_backend():
+    return "tesserocr" if _persistent_backend() else "pytesseract"
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the pipeline modules are flat files in src/, imported like the app imports them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
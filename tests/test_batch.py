@@ -0,0 +1,20 @@
+import config
+from batch import _init_worker, _pdf_name
+
+
+def test_pdf_names_differ_across_folders_and_extensions():
+    paths = ["contracts/a/vertrag.pdf", "contracts/b/vertrag.pdf", "contracts/a/vertrag.jpg"]
+    names = [_pdf_name(path) for path in paths]
+    assert len(set(names)) == 3
+    assert all(name.startswith("vertrag_") and name.endswith("_termination.pdf") for name in names)
+    assert _pdf_name(paths[0]) == names[0]
+
+
+def test_workers_share_the_llm_rate_limit(monkeypatch):
+    monkeypatch.setattr(config, "LLM_REQUESTS_PER_MINUTE", 200)
+    monkeypatch.setattr(config, "LLM_MAX_IN_FLIGHT", 8)
+    monkeypatch.setattr(config, "OCR_WORKERS", 8)
+    _init_worker({"extract_mode": None}, 4)
+    assert config.LLM_REQUESTS_PER_MINUTE == 50
+    assert config.LLM_MAX_IN_FLIGHT == 2
+    assert config.OCR_WORKERS == 1
@@ -0,0 +1,13 @@
+from chunking import _split_sections
+
+
+def test_ordinary_lines_do_not_start_sections():
+    page = "Allgemeine Bedingungen\nDer Vertrag gilt ab sofort\nund endet nach einem Jahr"
+    assert _split_sections(page) == [page]
+
+
+def test_headings_start_sections():
+    page = "Intro text\nKÜNDIGUNG\nText one\nsection 4 Payment\nText two\n§ 5 Haftung\nText three"
+    assert [section.splitlines()[0] for section in _split_sections(page)] == [
+        "Intro text", "KÜNDIGUNG", "section 4 Payment", "§ 5 Haftung"
+    ]
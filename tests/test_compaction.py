@@ -0,0 +1,34 @@
+from compaction import compact_text
+
+
+def _document(pages):
+    return "\f".join("\n".join(lines) for lines in pages)
+
+
+def test_repeated_header_and_page_numbers_are_removed_after_the_first_page():
+    pages = [
+        ["Musterversicherung AG", f"§ {number} Clause text of page {number}.", "", f"Seite {number} von 3"]
+        for number in range(1, 4)
+    ]
+    compact = compact_text(_document(pages))
+    assert compact.text.count("Musterversicherung AG") == 1
+    assert compact.text.count("Seite") == 1
+    assert all(f"§ {number}" in compact.text for number in range(1, 4))
+
+
+def test_table_rows_that_differ_only_by_number_are_kept():
+    pages = [
+        ["Beitragsübersicht", f"Beitrag {2022 + number}: {1100 + 100 * number} EUR", f"Contract Number: AB-{number}000"]
+        for number in range(1, 4)
+    ]
+    compact = compact_text(_document(pages))
+    assert compact.removed_lines == 2
+    for number in range(1, 4):
+        assert f"Beitrag {2022 + number}: {1100 + 100 * number} EUR" in compact.text
+        assert f"Contract Number: AB-{number}000" in compact.text
+
+
+def test_values_map_back_to_their_page():
+    pages = [["Header", "first page"], ["Header", "Vertragsnummer: 12-0000001"]]
+    compact = compact_text(_document(pages))
+    assert compact.page_of_value("12-0000001") == 2
@@ -0,0 +1,76 @@
+import io
+
+from fpdf import FPDF
+
+from data_extraction import DataExtractor
+from extraction_cache import ExtractionCache
+
+
+def _pdf(pages):
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=11)
+    for number in range(1, pages + 1):
+        pdf.add_page()
+        pdf.cell(0, 10, f"Page {number} clause text")
+    output = io.BytesIO()
+    pdf.output(output)
+    return output.getvalue()
+
+
+def _extractor(tmp_path, data):
+    extractor = DataExtractor(file_path=data, file_type="pdf", image_path=None)
+    extractor.pdf_engine.workers = 1
+    extractor.pdf_engine.ocr_fallback = False
+    extractor.extraction_cache = ExtractionCache(directory=str(tmp_path))
+    parsed = []
+    extractor.parallel_reads = []
+    iter_pages = extractor.pdf_engine.iter_pages
+
+    def recording(file, first_page=0, parallel=True):
+        extractor.parallel_reads.append(parallel)
+        for page in iter_pages(file, first_page, parallel):
+            parsed.append(page.text)
+            yield page
+
+    extractor.pdf_engine.iter_pages = recording
+    return extractor, parsed
+
+
+def test_early_exit_caches_the_pages_read_and_a_full_read_continues_after_them(tmp_path):
+    data = _pdf(3)
+    extractor, parsed = _extractor(tmp_path, data)
+    pages = extractor.iter_pages_from_pdf()
+    first = next(pages)
+    pages.close()
+    assert "Page 1" in first.text
+    assert len(parsed) == 1
+
+    extractor, parsed = _extractor(tmp_path, data)
+    texts = [page.text for page in extractor.iter_pages_from_pdf()]
+    assert len(texts) == 3 and "Page 1" in texts[0]
+    assert [("Page 2" in text, "Page 3" in text) for text in parsed] == [(True, False), (False, True)]
+
+    extractor, parsed = _extractor(tmp_path, data)
+    assert [page.text for page in extractor.iter_pages_from_pdf()] == texts
+    assert parsed == []
+
+
+def test_fields_mode_reads_page_by_page(tmp_path):
+    extractor, parsed = _extractor(tmp_path, _pdf(3))
+    list(extractor.iter_field_pages_from_pdf())
+    extractor.file_path = _pdf(4)
+    list(extractor.iter_pages_from_pdf())
+    assert extractor.parallel_reads == [False, True]
+
+
+def test_key_changes_with_the_ocr_language_and_text_layer_thresholds(tmp_path):
+    cache = ExtractionCache(directory=str(tmp_path))
+    engine = DataExtractor(file_path=None, file_type=None, image_path=None).pdf_engine
+    keys = {cache.key("doc", engine)}
+    engine.lang = engine.lang + "+deu"
+    keys.add(cache.key("doc", engine))
+    engine.min_chars += 1
+    keys.add(cache.key("doc", engine))
+    engine.min_density += 0.01
+    keys.add(cache.key("doc", engine))
+    assert len(keys) == 4
@@ -0,0 +1,31 @@
+from fast_path import detect_fields
+
+
+def test_company_name_label_is_not_the_quitting_party():
+    for text in ("Company name: Allianz Versicherung", "Firmenname: Nordlicht Versicherung", "Name: Alpen Leben GmbH"):
+        assert "quitting_party" not in detect_fields(text)
+
+
+def test_person_labels_give_the_quitting_party():
+    for text in ("Versicherungsnehmer: Max Mustermann", "Name des Versicherungsnehmers: Max Mustermann",
+                 "Policyholder: Max Mustermann"):
+        assert detect_fields(text)["quitting_party"].value == "Max Mustermann"
+
+
+def test_person_label_inside_another_word_does_not_match():
+    assert "quitting_party" not in detect_fields("Kundenservice Max Mustermann")
+
+
+def test_headings_ending_in_insurance_are_not_confident_company_matches():
+    for text in ("Home Insurance Policy Schedule", "Your Car Insurance",
+                 "Allgemeine Versicherungsbedingungen der Musterversicherung AG"):
+        match = detect_fields(text + "\nVersicherungsnehmer: Max Mustermann")["company"]
+        assert match.confidence < 0.8
+    assert detect_fields("Allgemeine Versicherungsbedingungen der Musterversicherung AG")["company"].value == "Musterversicherung AG"
+
+
+def test_letterhead_line_and_labels_give_the_company():
+    assert detect_fields("Musterversicherung AG\nPostfach 1234, 80000 München")["company"].value == "Musterversicherung AG"
+    assert detect_fields("Nordlicht Insurance Ltd\n")["company"].confidence >= 0.8
+    match = detect_fields("Intro\nVersicherer: Alpen Leben Versicherung")["company"]
+    assert (match.value, match.confidence) == ("Alpen Leben Versicherung", 0.9)
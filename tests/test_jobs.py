@@ -0,0 +1,28 @@
+import os
+import time
+
+from jobs import DONE, FAILED, JobQueue
+
+
+def _wait(queue, job_id):
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job["status"] in (DONE, FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_sweep_removes_expired_jobs_and_their_uploads(tmp_path):
+    queue = JobQueue(directory=str(tmp_path), workers=1, retention_seconds=3600)
+    old = queue.submit(b"not a pdf", filename="old.pdf")
+    new = queue.submit(b"not a pdf", filename="new.pdf")
+    old_upload = _wait(queue, old)["input_path"]
+    _wait(queue, new)
+    with queue._connect() as db:
+        db.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time() - 7200, old))
+
+    assert queue.sweep() == 1
+    assert queue.get(old) is None
+    assert not os.path.exists(old_upload)
+    assert os.path.exists(queue.get(new)["input_path"])
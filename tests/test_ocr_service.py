@@ -0,0 +1,28 @@
+import io
+import os
+import signal
+
+from PIL import Image
+
+from ocr_service import OCRService
+
+
+def _png():
+    output = io.BytesIO()
+    Image.new("RGB", (200, 100), "white").save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_a_killed_worker_does_not_break_later_calls():
+    service = OCRService(workers=1)
+    try:
+        service.ocr_image(_png())
+        pool = service._pool
+        for process in list(pool._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        service.ocr_image(_png())
+        result = service.ocr_image(_png())
+        assert service._pool is not pool
+        assert "BrokenProcessPool" not in (result.error or "")
+    finally:
+        service.shutdown()
@@ -0,0 +1,24 @@
+from pdf_engine import PDFExtractionEngine
+
+
+def _engine(workers, chunk_pages, window_pages):
+    engine = PDFExtractionEngine(workers=workers, chunk_pages=chunk_pages)
+    engine.window_pages = window_pages
+    return engine
+
+
+def test_pages_in_flight_stay_within_the_window():
+    for workers in (1, 4, 16):
+        for chunk_pages in (1, 5, 10):
+            engine = _engine(workers, chunk_pages, 40)
+            pool_workers, in_flight = engine.pool_size(500)
+            assert in_flight * chunk_pages <= 40
+            assert 1 <= pool_workers <= min(workers, in_flight)
+
+
+def test_one_chunk_in_flight_when_a_chunk_is_larger_than_the_window():
+    assert _engine(16, 50, 40).pool_size(500) == (1, 1)
+
+
+def test_short_documents_start_only_the_workers_they_need():
+    assert _engine(16, 10, 40).pool_size(25) == (3, 3)
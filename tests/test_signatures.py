@@ -0,0 +1,9 @@
+from signatures import SignatureProvider
+
+
+def test_names_differing_in_case_get_their_own_signature(tmp_path):
+    provider = SignatureProvider(cache_dir=str(tmp_path))
+    lower = provider.get("max mustermann", latency_budget=0)
+    title = provider.get("Max Mustermann", latency_budget=0)
+    assert lower != title
+    assert provider.get("Max  Mustermann ", latency_budget=0) == title
@@ -0,0 +1,34 @@
+import json
+
+import config
+import llm_gateway
+from data_extraction import DataExtractor
+from llm_cache import LLMResponseCache
+from structured_output import ContractInfo
+
+
+class NullGateway:
+    def __init__(self):
+        self.prompts = []
+
+    def chat_sync(self, model, messages, max_tokens, functions=None):
+        self.prompts.append(messages[-1]["content"])
+        return json.dumps({key: None for key in functions[0]["parameters"]["properties"]})
+
+
+def test_follow_up_round_reaches_the_model_when_nothing_was_found(tmp_path, monkeypatch):
+    gateway = NullGateway()
+    monkeypatch.setattr(llm_gateway, "get_gateway", lambda: gateway)
+    monkeypatch.setattr(config, "LLM_STRUCTURED_ATTEMPTS", 2)
+    extractor = DataExtractor(file_path=None, file_type=None, image_path=None)
+    extractor.response_cache = LLMResponseCache(directory=str(tmp_path))
+
+    info = extractor._extract_structured("Lorem ipsum dolor sit amet.", use_cache=True)
+    assert info.missing() == ContractInfo().missing()
+    assert len(gateway.prompts) == 2
+    assert gateway.prompts[0] != gateway.prompts[1]
+
+    # a rerun of the same text is answered from the cache for both rounds
+    extractor._extract_structured("Lorem ipsum dolor sit amet.", use_cache=True)
+    assert len(gateway.prompts) == 2
+    assert extractor.response_cache.stats() == {"hits": 2, "misses": 2}
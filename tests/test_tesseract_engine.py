@@ -0,0 +1,71 @@
+import threading
+import time
+
+import config
+import tesseract_engine
+
+
+class FakeAPI:
+    created = 0
+
+    def __init__(self, **options):
+        FakeAPI.created += 1
+        self.image = None
+
+    def SetVariable(self, name, value):
+        pass
+
+    def SetImage(self, image):
+        assert self.image is None, "engine shared by two calls at once"
+        self.image = image
+
+    def Recognize(self, timeout=0):
+        time.sleep(0.02)
+        return True
+
+    def GetUTF8Text(self):
+        return f"text of {self.image}"
+
+    def Clear(self):
+        self.image = None
+
+
+class FakeTesserocr:
+    PyTessBaseAPI = FakeAPI
+
+
+def _use_fake(monkeypatch, engines):
+    FakeAPI.created = 0
+    monkeypatch.setattr(config, "OCR_BACKEND", "tesserocr")
+    monkeypatch.setattr(config, "OCR_ENGINES", engines)
+    monkeypatch.setattr(tesseract_engine, "_tesserocr", FakeTesserocr)
+    monkeypatch.setattr(tesseract_engine, "_idle", {})
+    monkeypatch.setattr(tesseract_engine, "_created", {})
+
+
+def _in_thread(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+
+def test_engine_outlives_the_thread_that_loaded_it(monkeypatch):
+    _use_fake(monkeypatch, 4)
+    results = []
+    # every streamlit rerun is a new thread
+    for image in ("a", "b", "c"):
+        _in_thread(lambda image=image: results.append(tesseract_engine.image_to_string(image)))
+    assert results == ["text of a", "text of b", "text of c"]
+    assert FakeAPI.created == 1
+
+
+def test_concurrent_calls_share_at_most_ocr_engines(monkeypatch):
+    _use_fake(monkeypatch, 2)
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(tesseract_engine.image_to_string(i))) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == sorted(f"text of {i}" for i in range(6))
+    assert FakeAPI.created == 2